@@ -0,0 +1,82 @@
+"""Shared helpers for the benchmark scripts.
+
+The scripts import the server modules straight from ``src/`` the same way
+``uv run src/main.py`` does, so the required environment variables get
+placeholder values when they are not set.
+"""
+
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+os.environ.setdefault("CIT_BASE_URL", "http://127.0.0.1:1")
+os.environ.setdefault("REZ_BASE_URL", "http://127.0.0.1:4567")
+
+
+def summarize(name: str, samples: list[float]) -> dict:
+    samples = sorted(samples)
+    result = {
+        "name": name,
+        "n": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": samples[len(samples) // 2] * 1000,
+        "p95_ms": samples[int(len(samples) * 0.95) - 1] * 1000,
+        "min_ms": samples[0] * 1000,
+    }
+    print(
+        f"{name:<40} n={result['n']:<6} mean={result['mean_ms']:.3f}ms "
+        f"p50={result['p50_ms']:.3f}ms p95={result['p95_ms']:.3f}ms"
+    )
+    return result
+
+
+def timeit(fn, n: int) -> list[float]:
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def atimeit(fn, n: int) -> list[float]:
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def serve_static(body: bytes, content_type: str = "text/html", delay: float = 0.0):
+    """Starts a keep-alive capable HTTP server in a thread and returns its URL."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            if delay:
+                time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_POST = do_GET
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}", server
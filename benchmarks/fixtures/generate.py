@@ -0,0 +1,226 @@
+"""Writes the offline CIT fixtures used by the benchmarks.
+
+The files mirror the markup and PDF layout the tools read on the CIT site,
+with made-up student data. Re-run after changing anything here:
+
+    python benchmarks/fixtures/generate.py
+"""
+
+import random
+import zlib
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+PAPERS = [
+    ("CS3401", "Algorithms", "A+", "PASS"),
+    ("CS3452", "Theory of Computation", "A", "PASS"),
+    ("CS3461", "Operating Systems Laboratory", "O", "PASS"),
+    ("CS3481", "Database Management Systems Laboratory", "O", "PASS"),
+    ("CS3491", "Artificial Intelligence and Machine Learning", "B+", "PASS"),
+    ("CS3492", "Database Management Systems", "A", "PASS"),
+    ("GE3451", "Environmental Sciences and Sustainability", "B", "PASS"),
+    ("NM1011", "Naan Mudhalvan Course", "P", "PASS"),
+]
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _text_ops(style: str) -> bytes:
+    lines = [
+        "CHENNAI INSTITUTE OF TECHNOLOGY",
+        "(An Autonomous Institution)",
+        "Provisional Result - April / May 2025",
+        "Register Number : 2117220001 Name : STUDENT NAME",
+        "Degree & Branch : B.E. Computer Science and Engineering",
+    ]
+    ops = ["BT", "/F1 10 Tf"]
+    y = 800
+    for line in lines:
+        ops.append(f"1 0 0 1 40 {y} Tm ({_escape(line)}) Tj")
+        y -= 16
+
+    for code, name, grade, result in PAPERS:
+        if style == "TJ":
+            ops.append(f"1 0 0 1 40 {y} Tm [({code}) -2000 ({_escape(name)})] TJ")
+        else:
+            ops.append(f"1 0 0 1 40 {y} Tm ({code}) Tj")
+            ops.append(f"1 0 0 1 110 {y} Tm ({_escape(name)}) Tj")
+        ops.append(f"1 0 0 1 420 {y} Tm ({grade}) Tj")
+        ops.append(f"1 0 0 1 480 {y} Tm ({result}) Tj")
+        y -= 14
+
+    if style == "hex":
+        ops.append(
+            f"1 0 0 1 40 {y} Tm <{'GPA for IV Semester : 8.61'.encode().hex()}> Tj"
+        )
+    elif style == "TJ":
+        ops.append(f"1 0 0 1 40 {y} Tm [(GPA for IV Sem) 15 (ester : 8.61)] TJ")
+    else:
+        ops.append(f"1 0 0 1 40 {y} Tm (GPA for IV Semester) Tj")
+        ops.append(f"1 0 0 1 180 {y} Tm (: 8.61) Tj")
+
+    ops.append(f"1 0 0 1 40 {y - 40} Tm (Controller of Examinations) Tj")
+    ops.append("ET")
+    return "\n".join(ops).encode("latin-1")
+
+
+def make_result_pdf(style: str = "Tj") -> bytes:
+    """Builds a one page result PDF in the shape FPDF produces."""
+    rng = random.Random(7)
+    logo = zlib.compress(bytes(rng.randrange(256) for _ in range(48 * 48 * 3)))
+    content = zlib.compress(_text_ops(style))
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595.28 841.89] "
+        b"/Resources << /Font << /F1 5 0 R >> /XObject << /I1 6 0 R >> >> "
+        b"/Contents 4 0 R >>",
+        b"<< /Filter /FlateDecode /Length %d >>\nstream\n%s\nendstream"
+        % (len(content), content),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+        b"/Encoding /WinAnsiEncoding >>",
+        b"<< /Type /XObject /Subtype /Image /Width 48 /Height 48 "
+        b"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /FlateDecode "
+        b"/Length %d >>\nstream\n%s\nendstream" % (len(logo), logo),
+    ]
+
+    out = bytearray(b"%PDF-1.3\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    return bytes(out)
+
+
+SEMESTERS = [
+    ("2023DEC", "1", "I"),
+    ("2024MAY", "2", "II"),
+    ("2024DEC", "3", "III"),
+    ("2025MAY", "4", "IV"),
+]
+
+
+def _layout(title: str, body: str) -> str:
+    """Wraps a page body in the CIT site chrome: styles, scripts and menus."""
+    styles = "\n".join(
+        f".menu{i} {{ color: #{i:06x}; padding: {i % 7}px; }}" for i in range(120)
+    )
+    menu = "\n".join(
+        f'<tr><td class="menu{i}"><a href="page{i}.php?id={i}">Menu item {i}</a></td></tr>'
+        for i in range(60)
+    )
+    script = "\n".join(
+        f"function toggle{i}(el) {{ document.getElementById('m{i}').style.display = el.checked ? 'block' : 'none'; }}"
+        for i in range(80)
+    )
+    return f"""<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.01 Transitional//EN">
+<html>
+<head>
+<meta http-equiv="Content-Type" content="text/html; charset=iso-8859-1">
+<title>{title}</title>
+<style type="text/css">
+{styles}
+</style>
+<script language="javascript">
+{script}
+</script>
+</head>
+<body bgcolor="#FFFFFF" leftmargin="0" topmargin="0">
+<table width="100%" border="0" cellspacing="0" cellpadding="0">
+<tr><td colspan="2"><img src="images/banner.jpg" width="1000" height="90"></td></tr>
+<tr>
+<td width="200" valign="top"><table width="100%">{menu}</table></td>
+<td valign="top">
+{body}
+</td>
+</tr>
+</table>
+</body>
+</html>
+"""
+
+
+def make_exam_result_page() -> str:
+    options = "\n".join(
+        f'<option value="{code}{div} ">{code} - Semester {sem}</option>'
+        for code, div, sem in SEMESTERS
+    )
+    tables = []
+    for _, div, sem in SEMESTERS:
+        rows = "\n".join(
+            f'<tr class="row1"><td class="tablecol2">{sem}</td>'
+            f'<td class="tablecol2">{code}</td><td class="tablecol2">{name}</td>'
+            f'<td class="tablecol2">{grade}$</td><td class="tablecol2">{result}</td></tr>'
+            for code, name, grade, result in PAPERS
+        )
+        tables.append(
+            f'<div id="div_{div}" style="display:none"><table class="tbl">'
+            f'<tr class="tablehead"><th>Sem</th><th>Code</th><th>Subject</th>'
+            f"<th>Grade</th><th>Result</th></tr>\n{rows}</table></div>"
+        )
+    body = f"""<form name="frm" method="post">
+<table><tr><td>Exam</td><td><select name="exam_cd" onchange="showResult(this.value)">
+{options}
+</select></td></tr></table>
+</form>
+{"".join(tables)}"""
+    return _layout("Exam Result", body)
+
+
+def make_hallticket_page() -> str:
+    radios = "\n".join(
+        f'<tr><td><input type="radio" name="exam_cd" id="exam_cd" value="{code} ">'
+        f"</td><td>{code} - Semester {sem}</td></tr>"
+        for code, _, sem in SEMESTERS[-2:]
+    )
+    body = f"""<form name="frm" action="rpt_exam_hallticket.php" method="get">
+<table class="tbl">{radios}</table>
+<input type="submit" value="Download">
+</form>"""
+    return _layout("Hallticket", body)
+
+
+def make_profile_page() -> str:
+    fields = [
+        ("Register Number", "2117220001"),
+        ("Name", "STUDENT NAME"),
+        ("Date of Birth", "01-01-2004"),
+        ("Degree", "B.E."),
+        ("Branch", "Computer Science and Engineering"),
+        ("Batch", "2022 - 2026"),
+        ("Email", "student@citchennai.net"),
+        ("Mobile", "9000000000"),
+    ]
+    labels = "".join(f"<tr><td>{label}</td></tr>" for label, _ in fields)
+    values = "".join(f"<tr><td> {value} </td></tr>" for _, value in fields)
+    body = f"""<table class="tbl"><tr>
+<td align="center"><img src="photo.php" width="120"></td>
+<td><table>{labels}</table></td>
+<td><table>{values}</table></td>
+</tr></table>"""
+    return _layout("Personal Details", body)
+
+
+def main():
+    (HERE / "exam_result.html").write_text(make_exam_result_page())
+    (HERE / "param_exam_hallticket.html").write_text(make_hallticket_page())
+    (HERE / "personal.html").write_text(make_profile_page())
+    (HERE / "result.pdf").write_bytes(make_result_pdf("Tj"))
+    (HERE / "result_tj_array.pdf").write_bytes(make_result_pdf("TJ"))
+    (HERE / "result_hex.pdf").write_bytes(make_result_pdf("hex"))
+
+
+if __name__ == "__main__":
+    main()
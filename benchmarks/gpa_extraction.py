@@ -0,0 +1,47 @@
+"""GPA extraction: pypdf page text extraction vs the content stream scan.
+
+Usage:
+    python benchmarks/gpa_extraction.py [-n 300]
+"""
+
+import argparse
+import logging
+
+import _common
+from _common import summarize, timeit
+
+FIXTURES = _common.ROOT / "benchmarks" / "fixtures"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=300)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    import gpa
+
+    for name in ("result.pdf", "result_tj_array.pdf", "result_hex.pdf"):
+        pdf = (FIXTURES / name).read_bytes()
+        print(f"{name}: scan={gpa._scan_content_streams(pdf)!r}")
+        summarize(
+            "  pypdf extract_text (before)",
+            timeit(lambda: gpa._extract_with_pypdf(pdf), args.n),
+        )
+        summarize(
+            "  content stream scan",
+            timeit(lambda: gpa._scan_content_streams(pdf), args.n),
+        )
+
+        def uncached():
+            gpa.gpa_memo.clear()
+            gpa.extract_gpa(pdf)
+
+        summarize("  extract_gpa, cold memo (after)", timeit(uncached, args.n))
+        summarize(
+            "  extract_gpa, memo hit", timeit(lambda: gpa.extract_gpa(pdf), args.n)
+        )
+
+
+if __name__ == "__main__":
+    main()
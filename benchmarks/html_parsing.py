@@ -0,0 +1,105 @@
+"""Parse time of the CIT pages per tree builder, with and without strainers.
+
+Also measures how long the event loop is blocked while a page is parsed
+inline vs in the parsing worker pool.
+
+Usage:
+    python benchmarks/html_parsing.py [-n 100]
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from importlib.util import find_spec
+
+import _common
+from _common import summarize, timeit
+
+FIXTURES = _common.ROOT / "benchmarks" / "fixtures"
+
+
+async def loop_stall(parse, html: str, offload: bool, n: int = 20) -> float:
+    """Worst gap between ticks of a 1 ms ticker while `n` parses run."""
+    import parsing
+
+    worst = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal worst
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            worst = max(worst, now - last)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    for _ in range(n):
+        if offload:
+            await parsing.run(parse, html)
+        else:
+            parse(html)
+            await asyncio.sleep(0)
+    done = True
+    await task
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=100)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    import pages
+    import parsing
+
+    strainers = pages.strainers()
+    cases = [
+        ("exam_result.html", pages.parse_result_page, strainers[pages.RESULT_PAGE]),
+        (
+            "param_exam_hallticket.html",
+            pages.parse_hallticket_page,
+            strainers[pages.HALLTICKET_PAGE],
+        ),
+        ("personal.html", pages.parse_profile_page, strainers[pages.PROFILE_PAGE]),
+    ]
+    backends = ["html.parser"] + [b for b in ("lxml",) if find_spec(b)]
+
+    for name, parse, strainer in cases:
+        html = (FIXTURES / name).read_text()
+        print(f"{name} ({len(html)} bytes)")
+        expected = None
+        for backend in backends:
+            parsing.BACKEND = backend
+            result = parse(html)
+            expected = expected or result
+            assert result == expected, f"{backend} parses {name} differently"
+
+            summarize(
+                f"  {backend} full tree",
+                timeit(lambda: parsing.soup(html), args.n),
+            )
+            if strainer is not None:
+                summarize(
+                    f"  {backend} strained tree",
+                    timeit(lambda: parsing.soup(html, strainer), args.n),
+                )
+            summarize(
+                f"  {backend} {parse.__name__}", timeit(lambda: parse(html), args.n)
+            )
+
+    parsing.BACKEND = "html.parser"
+    html = (FIXTURES / "exam_result.html").read_text()
+    for offload in (False, True):
+        stall = asyncio.run(loop_stall(pages.parse_result_page, html, offload))
+        label = "worker pool" if offload else "on the event loop"
+        print(f"worst event loop stall parsing {label}: {stall * 1000:.2f}ms")
+    parsing.shutdown()
+
+
+if __name__ == "__main__":
+    main()
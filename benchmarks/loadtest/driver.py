@@ -0,0 +1,311 @@
+"""End-to-end load test of one server instance.
+
+Starts the fake CIT server and the real server (``src/main.py``) as
+subprocesses, then runs N concurrent streamable-HTTP MCP clients. Each one
+logs in through the browser endpoint and then repeats
+get_results -> get_result -> download_result -> GET /pdf/result and
+get_halltickets -> download_hallticket -> GET /pdf/hallticket.
+
+Reports throughput, p50/p95/p99 latency per step and the server's RSS
+per logged in session.
+
+Usage:
+    python benchmarks/loadtest/driver.py --clients 50 --iterations 3 --latency 80
+    python benchmarks/loadtest/driver.py --server-env REZ_SESSION_STORE=sqlite -o run.json
+    python benchmarks/loadtest/driver.py --slow-rate 0.02 --error-rate 0.01 \
+        --server-env REZ_HTTP_HEDGE=true
+    python benchmarks/loadtest/driver.py --server-env REZ_WORKERS=4 \
+        --server-env REZ_SESSION_MODE=sealed --server-env REZ_SESSION_STORE=sqlite
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from contextlib import AsyncExitStack
+from pathlib import Path
+
+import httpx
+from fastmcp import Client
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+HERE = Path(__file__).resolve().parent
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_for_port(port: int, process: subprocess.Popen, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"process exited with {process.returncode}")
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.05)
+    raise TimeoutError(f"port {port} did not open")
+
+
+def rss_kb(pid: int) -> int:
+    """RSS of a process and its children, such as uvicorn workers."""
+    total = 0
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            total += int(line.split()[1])
+    for child in Path(f"/proc/{pid}/task/{pid}/children").read_text().split():
+        total += rss_kb(int(child))
+    return total
+
+
+def percentile(samples: list[float], p: float) -> float:
+    samples = sorted(samples)
+    return samples[min(int(len(samples) * p), len(samples) - 1)]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def timed(self, step: str, coro):
+        start = time.perf_counter()
+        try:
+            return await coro
+        except Exception:
+            self.errors[step] += 1
+            raise
+        finally:
+            self.latencies[step].append(time.perf_counter() - start)
+
+
+def text(result) -> str:
+    return result.content[0].text
+
+
+def link(markdown: str) -> str:
+    return re.search(r"\((http[^)]+)\)", markdown).group(1)
+
+
+async def run_client(
+    index: int,
+    args,
+    rez_url: str,
+    http: httpx.AsyncClient,
+    rec: Recorder,
+    logged_in: asyncio.Barrier,
+):
+    async with AsyncExitStack() as stack:
+        mcp = await stack.enter_async_context(Client(f"{rez_url}/rez/mcp"))
+        login_link = link(text(await rec.timed("login", mcp.call_tool("login", {}))))
+        response = await rec.timed(
+            "POST /auth/login",
+            http.post(
+                login_link,
+                json={"username": f"2117220{index:03d}", "password": "secret"},
+            ),
+        )
+        response.raise_for_status()
+
+        # REZ_SESSION_MODE=sealed: reconnect with the session token
+        session_token = response.json().get("session_token")
+        if session_token:
+            mcp = await stack.enter_async_context(
+                Client(f"{rez_url}/rez/mcp", auth=session_token)
+            )
+        await logged_in.wait()
+
+        for _ in range(args.iterations):
+            codes = json.loads(
+                text(await rec.timed("get_results", mcp.call_tool("get_results", {})))
+            )
+            exam_code = codes[-1]
+            await rec.timed(
+                "get_result", mcp.call_tool("get_result", {"exam_code": exam_code})
+            )
+            pdf_link = link(
+                text(
+                    await rec.timed(
+                        "download_result",
+                        mcp.call_tool("download_result", {"exam_code": exam_code}),
+                    )
+                )
+            )
+            (await rec.timed("GET /pdf/result", http.get(pdf_link))).raise_for_status()
+
+            halltickets = json.loads(
+                text(
+                    await rec.timed(
+                        "get_halltickets", mcp.call_tool("get_halltickets", {})
+                    )
+                )
+            )
+            ht_link = link(
+                text(
+                    await rec.timed(
+                        "download_hallticket",
+                        mcp.call_tool(
+                            "download_hallticket", {"exam_code": halltickets[0]}
+                        ),
+                    )
+                )
+            )
+            (
+                await rec.timed("GET /pdf/hallticket", http.get(ht_link))
+            ).raise_for_status()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument(
+        "--latency", type=float, default=50, help="fake CIT ms per response"
+    )
+    parser.add_argument("--jitter", type=float, default=10)
+    parser.add_argument("--page-kb", type=int, default=0)
+    parser.add_argument("--pdf-kb", type=int, default=0)
+    parser.add_argument("--slow-rate", type=float, default=0)
+    parser.add_argument("--slow-ms", type=float, default=3000)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument(
+        "--server-env", action="append", default=[], metavar="KEY=VALUE"
+    )
+    parser.add_argument("-o", "--output")
+    args = parser.parse_args()
+
+    cit_port, rez_port = free_port(), free_port()
+    rez_url = f"http://127.0.0.1:{rez_port}"
+    env = {
+        **os.environ,
+        "CIT_BASE_URL": f"http://127.0.0.1:{cit_port}",
+        "REZ_BASE_URL": rez_url,
+        "REZ_HOST": "127.0.0.1",
+        "REZ_PORT": str(rez_port),
+        **dict(item.split("=", 1) for item in args.server_env),
+    }
+
+    cit = subprocess.Popen(
+        [
+            sys.executable,
+            str(HERE / "fake_cit.py"),
+            "--port",
+            str(cit_port),
+            "--latency",
+            str(args.latency),
+            "--jitter",
+            str(args.jitter),
+            "--page-kb",
+            str(args.page_kb),
+            "--pdf-kb",
+            str(args.pdf_kb),
+            "--slow-rate",
+            str(args.slow_rate),
+            "--slow-ms",
+            str(args.slow_ms),
+            "--error-rate",
+            str(args.error_rate),
+        ],
+    )
+    rez = subprocess.Popen(
+        [sys.executable, "src/main.py"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        await wait_for_port(cit_port, cit)
+        await wait_for_port(rez_port, rez)
+        rss_idle = rss_kb(rez.pid)
+
+        rec = Recorder()
+        logged_in = asyncio.Barrier(args.clients + 1)
+        limits = httpx.Limits(max_connections=args.clients * 2)
+        async with httpx.AsyncClient(timeout=120, limits=limits) as http:
+            start = time.perf_counter()
+            clients = [
+                asyncio.create_task(run_client(i, args, rez_url, http, rec, logged_in))
+                for i in range(args.clients)
+            ]
+            await logged_in.wait()
+            rss_logged_in = rss_kb(rez.pid)
+            flow_start = time.perf_counter()
+            outcomes = await asyncio.gather(*clients, return_exceptions=True)
+            end = time.perf_counter()
+        rss_end = rss_kb(rez.pid)
+    finally:
+        rez.terminate()
+        cit.terminate()
+        rez.wait()
+        cit.wait()
+
+    failed = [o for o in outcomes if isinstance(o, BaseException)]
+    ops = sum(
+        len(v)
+        for k, v in rec.latencies.items()
+        if k not in ("login", "POST /auth/login")
+    )
+    report = {
+        "clients": args.clients,
+        "iterations": args.iterations,
+        "upstream_latency_ms": args.latency,
+        "server_env": args.server_env,
+        "failed_clients": len(failed),
+        "duration_s": end - start,
+        "flows_per_s": args.clients * args.iterations / (end - flow_start),
+        "ops_per_s": ops / (end - flow_start),
+        "rss_idle_mb": rss_idle / 1024,
+        "rss_logged_in_mb": rss_logged_in / 1024,
+        "rss_end_mb": rss_end / 1024,
+        "rss_per_session_kb": (rss_logged_in - rss_idle) / args.clients,
+        "rss_per_session_after_flows_kb": (rss_end - rss_idle) / args.clients,
+        "steps": {
+            step: {
+                "count": len(samples),
+                "errors": rec.errors.get(step, 0),
+                "p50_ms": percentile(samples, 0.50) * 1000,
+                "p95_ms": percentile(samples, 0.95) * 1000,
+                "p99_ms": percentile(samples, 0.99) * 1000,
+            }
+            for step, samples in rec.latencies.items()
+        },
+    }
+
+    print(
+        f"{args.clients} clients x {args.iterations} flows, upstream {args.latency}ms"
+    )
+    print(f"{'step':<22} {'count':>6} {'err':>4} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for step, stats in report["steps"].items():
+        print(
+            f"{step:<22} {stats['count']:>6} {stats['errors']:>4} "
+            f"{stats['p50_ms']:>7.1f}ms {stats['p95_ms']:>7.1f}ms {stats['p99_ms']:>7.1f}ms"
+        )
+    print(
+        f"throughput: {report['flows_per_s']:.1f} flows/s, {report['ops_per_s']:.1f} ops/s"
+    )
+    print(
+        f"server RSS: idle {report['rss_idle_mb']:.1f}MB, logged in {report['rss_logged_in_mb']:.1f}MB, "
+        f"end {report['rss_end_mb']:.1f}MB -> {report['rss_per_session_kb']:.1f}KB/session "
+        f"({report['rss_per_session_after_flows_kb']:.1f}KB/session after the flows)"
+    )
+    if failed:
+        print(f"{len(failed)} clients failed, first error: {failed[0]!r}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+"""A local stand-in for the CIT results site.
+
+Serves the login form post and every page and PDF the server fetches,
+built from the fixtures in benchmarks/fixtures, with configurable latency
+and payload sizes. A share of the page and PDF responses can be made
+very slow or fail with a 503, to look at tail latency.
+
+Usage:
+    python benchmarks/loadtest/fake_cit.py --port 8700 --latency 80 --jitter 40 --pdf-kb 200
+    python benchmarks/loadtest/fake_cit.py --slow-rate 0.02 --slow-ms 3000 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import random
+import secrets
+import sys
+from pathlib import Path
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+FIXTURES = Path(__file__).resolve().parent.parent / "fixtures"
+
+
+def create_app(
+    latency_ms: float = 50,
+    jitter_ms: float = 0,
+    page_kb: int = 0,
+    pdf_kb: int = 0,
+    slow_rate: float = 0,
+    slow_ms: float = 0,
+    error_rate: float = 0,
+) -> Starlette:
+    def pad_html(name: str) -> bytes:
+        html = (FIXTURES / name).read_bytes()
+        padding = b"<!-- " + b"x" * max(page_kb * 1024 - len(html), 0) + b" -->"
+        return html.replace(b"</body>", padding + b"</body>")
+
+    def pad_pdf(name: str) -> bytes:
+        pdf = (FIXTURES / name).read_bytes()
+        # trailing comments after %%EOF are ignored by PDF readers
+        return pdf + b"%" + b"x" * max(pdf_kb * 1024 - len(pdf), 0) + b"\n"
+
+    pages = {
+        "/exam/exam_result.php": ("text/html", pad_html("exam_result.html")),
+        "/exam/param_exam_hallticket.php": (
+            "text/html",
+            pad_html("param_exam_hallticket.html"),
+        ),
+        "/personal.php": ("text/html", pad_html("personal.html")),
+        "/exam/result.php": ("application/pdf", pad_pdf("result.pdf")),
+        "/exam/rpt_exam_hallticket.php": ("application/pdf", pad_pdf("result.pdf")),
+    }
+
+    async def delay():
+        await asyncio.sleep(
+            max(latency_ms + random.uniform(-jitter_ms, jitter_ms), 0) / 1000
+        )
+
+    async def login(request: Request) -> Response:
+        await delay()
+        form = await request.form()
+        if not form.get("user_name") or form.get("pass_word") == "wrong":
+            return Response("<html>Student Login</html>", media_type="text/html")
+
+        return Response(
+            status_code=302,
+            headers={
+                "Location": "/home.php",
+                "Set-Cookie": f"PHPSESSID={secrets.token_hex(13)}; path=/",
+            },
+        )
+
+    async def page(request: Request) -> Response:
+        await delay()
+        if random.random() < slow_rate:
+            await asyncio.sleep(slow_ms / 1000)
+        if random.random() < error_rate:
+            return Response("Service Unavailable", status_code=503)
+        if "PHPSESSID=" not in request.headers.get("cookie", ""):
+            return Response(status_code=302, headers={"Location": "/login.php"})
+
+        media_type, body = pages[request.url.path]
+        return Response(body, media_type=media_type)
+
+    routes = [Route("/login.php", login, methods=["POST"])]
+    routes += [Route(path, page) for path in pages]
+    return Starlette(routes=routes)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--latency", type=float, default=50, help="ms per response")
+    parser.add_argument("--jitter", type=float, default=0, help="+/- ms")
+    parser.add_argument("--page-kb", type=int, default=0, help="pad HTML pages")
+    parser.add_argument("--pdf-kb", type=int, default=0, help="pad PDFs")
+    parser.add_argument(
+        "--slow-rate", type=float, default=0, help="share of slow pages and PDFs"
+    )
+    parser.add_argument("--slow-ms", type=float, default=3000, help="extra ms")
+    parser.add_argument(
+        "--error-rate", type=float, default=0, help="share answered with a 503"
+    )
+    args = parser.parse_args()
+
+    app = create_app(
+        args.latency,
+        args.jitter,
+        args.page_kb,
+        args.pdf_kb,
+        args.slow_rate,
+        args.slow_ms,
+        args.error_rate,
+    )
+    print(f"fake CIT on http://{args.host}:{args.port}", file=sys.stderr)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Tool-call throughput with each logging pipeline.
+
+Calls `get_results` on the offline fixtures -n times, with cold page
+caches but warm parse memos, so each call logs its INFO lines without
+spending long on parsing. This runs once per pipeline:
+
+- a `StreamHandler` on the root logger, as `logging.basicConfig` set up,
+  formatting and writing on the event loop
+- the queue pipeline of `logs.setup_logging`, as text and as JSON
+- the queue pipeline sampling `utils` and `tools` at --sample
+
+Logs go to a temporary file. --write-delay-ms makes each write that much
+slower, as a busy pipe or disk behind stderr would. Throughput counts the
+calls only, "drain" is the time the writer takes afterwards to catch up.
+
+Usage:
+    python benchmarks/logging_pipeline.py [-n 2000] [--write-delay-ms 0 0.2] [--sample 0.1]
+"""
+
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+
+import _common  # noqa: F401
+from suite import _new_session, _offline_tools
+
+
+class _SlowFile:
+    """A file whose writes take `delay` seconds longer."""
+
+    def __init__(self, file, delay: float):
+        self.file = file
+        self.delay = delay
+
+    def write(self, text: str) -> int:
+        if self.delay:
+            time.sleep(self.delay)
+        return self.file.write(text)
+
+    def flush(self):
+        self.file.flush()
+
+
+def _stream_handler(stream):
+    import logs
+
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter(logs.TEXT_FORMAT))
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+
+def _queue(stream, log_format: str, sample: str = ""):
+    import logs
+    from config import REZConfig
+
+    REZConfig.REZ_LOG_FORMAT = log_format
+    REZConfig.REZ_LOG_SAMPLE = sample
+    logs.setup_logging(stream)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=2000)
+    parser.add_argument("--write-delay-ms", type=float, nargs="+", default=[0, 0.2])
+    parser.add_argument("--sample", type=float, default=0.1)
+    args = parser.parse_args()
+
+    import logs
+    from tools.results import get_results
+
+    ctx = _offline_tools()
+    await get_results(ctx)  # warms the parse memo
+
+    pipelines = (
+        ("StreamHandler", _stream_handler),
+        ("queue, text", lambda stream: _queue(stream, "text")),
+        ("queue, json", lambda stream: _queue(stream, "json")),
+        (
+            f"queue, text, sampled {args.sample}",
+            lambda stream: _queue(
+                stream, "text", f"utils:{args.sample},tools:{args.sample}"
+            ),
+        ),
+    )
+
+    for delay in args.write_delay_ms:
+        print(f"writes delayed by {delay}ms")
+        for name, setup in pipelines:
+            with tempfile.TemporaryFile("w+") as file:
+                setup(_SlowFile(file, delay / 1000))
+
+                start = time.perf_counter()
+                for _ in range(args.n):
+                    _new_session()
+                    await get_results(ctx)
+                elapsed = time.perf_counter() - start
+
+                start = time.perf_counter()
+                logs.stop_logging()
+                drained = time.perf_counter() - start
+
+                file.seek(0)
+                lines = sum(1 for _ in file)
+
+            print(
+                f"  {name:<28} {args.n / elapsed:>7.0f} calls/s, "
+                f"{lines / args.n:.1f} lines per call, drain {drained * 1000:.0f}ms"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""Shows that a slow CIT login no longer stalls other requests.
+
+A stand-in login server answers ``/login.php`` after ``--delay`` seconds.
+While a login is in flight against it, ``GET /`` is timed on the same
+event loop. With the old blocking ``httpx.Client`` the probe waited for
+the whole login; now it is answered right away.
+
+It then sends --replays concurrent logins with one login token, of which
+only one may succeed, and checks that a wrong password leaves the token
+usable for another try.
+
+Usage:
+    python benchmarks/login_concurrency.py [--delay 2] [--replays 3]
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+
+import _common  # noqa: F401
+
+import httpx
+
+
+def serve_login(delay: float) -> str:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(delay)
+            if b"pass_word=wrong" in body:
+                page = b"<h1>Student Login</h1>"
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(page)))
+                self.end_headers()
+                self.wfile.write(page)
+                return
+
+            self.send_response(302)
+            self.send_header("Location", "/home.php")
+            self.send_header("Set-Cookie", "PHPSESSID=bench; path=/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--delay", type=float, default=2.0)
+    parser.add_argument("--probes", type=int, default=5)
+    parser.add_argument("--replays", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    base_url = serve_login(args.delay)
+
+    from config import REZConfig
+
+    REZConfig.CIT_BASE_URL = base_url
+    REZConfig.REZ_PREFETCH = False  # the stand-in only answers the login
+
+    from manager import rez_app, sessions
+    from signer import generate_token
+
+    transport = httpx.ASGITransport(app=rez_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://rez") as rez:
+
+        async def login(token=None, username="bench", password="secret"):
+            start = time.perf_counter()
+            response = await rez.post(
+                "/auth/login",
+                params={"token": token or generate_token("bench-session")},
+                json={"username": username, "password": password},
+            )
+            return response.status_code, time.perf_counter() - start
+
+        async def probe():
+            await asyncio.sleep(0.1)  # let the login reach the slow server
+            start = time.perf_counter()
+            await rez.get("/")
+            return time.perf_counter() - start
+
+        results = await asyncio.gather(login(), *(probe() for _ in range(args.probes)))
+
+        token = generate_token("replayed-session")
+        replays = await asyncio.gather(
+            *(login(token, username=f"user{i}") for i in range(args.replays))
+        )
+
+        retried = generate_token("retried-session")
+        wrong = await login(retried, password="wrong")
+        right = await login(retried)
+
+    (status, login_time), probes = results[0], results[1:]
+    print(f"login status={status} took {login_time * 1000:.1f}ms")
+    print(f"concurrent GET / worst case {max(probes) * 1000:.1f}ms")
+    assert "bench-session" in sessions, "login did not create a session"
+    assert max(probes) < args.delay / 2, "login blocked the event loop"
+
+    statuses = sorted(status for status, _ in replays)
+    print(f"{args.replays} concurrent logins with one token: {statuses}")
+    assert statuses == [200] + [401] * (args.replays - 1), "a token was reused"
+
+    print(f"wrong password then right: {wrong[0]}, {right[0]}")
+    assert (wrong[0], right[0]) == (401, 200), "a failed login used up the token"
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
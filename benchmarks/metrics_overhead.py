@@ -0,0 +1,105 @@
+"""Cost of recording metrics on the tool path.
+
+Times `Histogram.observe` and `Counter.inc` on their own, then
+`AuthMiddleware.on_call_tool` with the tool metrics recorded and with
+them replaced by no-ops, and finally one scrape of `/metrics`.
+
+Usage:
+    python benchmarks/metrics_overhead.py [-n 2000] [--batch 1000]
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import _common  # noqa: F401
+from _common import atimeit, summarize, timeit
+
+
+class _Null:
+    def observe(self, *args):
+        pass
+
+    def inc(self, *args):
+        pass
+
+
+class _Context:
+    def __init__(self, session):
+        self.session_id = session.session_id
+
+    def set_state(self, key, value):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=1000, help="calls per sample")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    import main as server
+    import metrics
+    from data import SessionData, sessions
+
+    histogram = metrics.Histogram("bench_seconds", "bench", ("tool",))
+    counter = metrics.Counter("bench_total", "bench", ("tool",))
+    batch = range(args.batch)
+
+    def observe():
+        for _ in batch:
+            histogram.observe(0.042, "get_results")
+
+    def inc():
+        for _ in batch:
+            counter.inc(1, "get_results")
+
+    for name, fn in (("Histogram.observe", observe), ("Counter.inc", inc)):
+        result = summarize(f"{name} x{args.batch}", timeit(fn, args.n))
+        print(f"  -> {result['p50_ms'] * 1e6 / args.batch:.0f}ns per call")
+
+    session = SessionData(
+        "2117220001",
+        "0" * 32,
+        "PHPSESSID=bench",
+        expiresAt=datetime.now() + timedelta(hours=1),
+    )
+    sessions[session.session_id] = session
+    mctx = SimpleNamespace(
+        message=SimpleNamespace(name="get_results", arguments={}),
+        fastmcp_context=_Context(session),
+    )
+    middleware = server.AuthMiddleware()
+
+    async def call_next(mctx):
+        return None
+
+    async def tool_calls():
+        for _ in batch:
+            await middleware.on_call_tool(mctx, call_next)
+
+    recorded = summarize(
+        f"on_call_tool x{args.batch} (metrics)",
+        asyncio.run(atimeit(tool_calls, args.n // 10)),
+    )
+    server.TOOL_LATENCY = server.TOOL_ERRORS = _Null()
+    bare = summarize(
+        f"on_call_tool x{args.batch} (no metrics)",
+        asyncio.run(atimeit(tool_calls, args.n // 10)),
+    )
+    overhead = (recorded["p50_ms"] - bare["p50_ms"]) * 1e6 / args.batch
+    print(f"  -> metrics add {overhead:.0f}ns per tool call")
+
+    # a realistic label spread: every tool and CIT path seen
+    for tool in ("login", "logout", "get_profile", "get_results", "get_result"):
+        metrics.TOOL_LATENCY.observe(0.1, tool)
+    for path in ("/login.php", "/exam/exam_result.php", "/exam/result.php"):
+        metrics.UPSTREAM_LATENCY.observe(0.1, path)
+    summarize("render /metrics", timeit(metrics.render, args.n // 10))
+
+
+if __name__ == "__main__":
+    main()
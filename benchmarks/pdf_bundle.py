@@ -0,0 +1,119 @@
+"""Streaming a ZIP bundle of PDFs as they arrive.
+
+Builds bundles of --docs PDFs of --pdf-kb each, fetched through
+`pages.pdf` from a stand-in CIT with --latency ms of latency. Before each
+bundle `pdf_cache` is filled with the PDFs of other students. Reports the
+time taken, the peak memory traced while streaming and how many of the
+other students' PDFs are still cached afterwards.
+
+This runs for the bundle as it is, which leaves `pdf_cache` alone, as it
+was before, when every PDF of the bundle went into `pdf_cache`, and for
+the same ZIP built in memory from PDFs fetched one after the other, as one
+download per exam code would.
+
+Each bundle is built twice, once timed and once with memory traced.
+httpx responses sit in a reference cycle until the cycle collector gets to
+them, so the traced run collects garbage after every chunk and PDF. Its
+peak is then what the bundle holds, not responses waiting to be freed.
+
+Usage:
+    python benchmarks/pdf_bundle.py [--docs 10 50 200] [--pdf-kb 300] [--latency 100]
+"""
+
+import argparse
+import asyncio
+import gc
+import io
+import logging
+import os
+import time
+import tracemalloc
+import zipfile
+
+import _common  # noqa: F401
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--pdf-kb", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=100)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    import httpx
+
+    import bundle
+    import pages
+    import utils
+    from config import REZConfig
+    from data import SessionData
+
+    async def handler(request):
+        await asyncio.sleep(args.latency / 1000)
+        return httpx.Response(200, content=os.urandom(args.pdf_kb * 1024))
+
+    utils._client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), base_url="http://cit.invalid"
+    )
+    session = SessionData("2117220001", "0" * 32, "PHPSESSID=bench")
+    others = [
+        SessionData(f"21172{i:05d}", "1" * 32, "PHPSESSID=other") for i in range(20)
+    ]
+
+    async def fill_cache() -> list:
+        pages.pdf_cache.clear()
+        await asyncio.gather(
+            *(pages.pdf(other, "result", "2025MAY") for other in others)
+        )
+        return [pages._pdf_key(other, "result", "2025MAY") for other in others]
+
+    def collect(traced: bool):
+        if traced:
+            gc.collect()
+
+    async def streamed(files, traced: bool):
+        async for chunk in bundle.zip_pdfs(session, "result", files):
+            collect(traced)
+
+    async def buffered(files, traced: bool):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as zf:
+            for exam_code, name in files.items():
+                zf.writestr(
+                    name, await pages.pdf(session, "result", exam_code, store=False)
+                )
+                collect(traced)
+
+    async def storing(session, kind, exam_code, store=True):
+        return await pages.pdf(session, kind, exam_code)
+
+    for docs in args.docs:
+        files = {f"{i:04d}": f"RESULT_{i:04d}.pdf" for i in range(docs)}
+        print(f"{docs} PDFs ({docs * args.pdf_kb / 1024:.1f}MB):")
+
+        for name, build, fetch in (
+            (f"streamed, fan-out {REZConfig.REZ_BUNDLE_FANOUT}", streamed, pages.pdf),
+            ("streamed into pdf_cache (before)", streamed, storing),
+            ("one by one, buffered", buffered, pages.pdf),
+        ):
+            bundle.pdf = fetch
+            cached = await fill_cache()
+            start = time.perf_counter()
+            await build(files, traced=False)
+            elapsed = time.perf_counter() - start
+            kept = sum(key in pages.pdf_cache for key in cached)
+
+            await fill_cache()
+            tracemalloc.start()
+            await build(files, traced=True)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(
+                f"  {name:<34} {elapsed * 1000:>6.0f}ms, peak {peak / 2**20:>5.1f}MB, "
+                f"other students' PDFs cached {kept}/{len(cached)}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
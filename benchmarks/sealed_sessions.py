@@ -0,0 +1,100 @@
+"""Server-side sessions against sealed session tokens.
+
+Times what the middleware does per tool call to find the session: a dict
+lookup, the in-memory store, or opening a sealed token (AES-GCM, JSON and
+the revocation check). Then measures the memory the server holds for
+--users logged in users in each mode.
+
+Usage:
+    python benchmarks/sealed_sessions.py [-n 20000] [--users 100000] [--logged-out 0.1]
+"""
+
+import argparse
+import logging
+import os
+import random
+import secrets
+import tracemalloc
+
+import _common  # noqa: F401
+from _common import summarize, timeit
+
+
+def _session(i: int):
+    from data import SessionData
+
+    return SessionData(
+        f"21172200{i:05d}", secrets.token_hex(16), f"PHPSESSID={secrets.token_hex(13)}"
+    )
+
+
+def _traced(build) -> tuple[object, int]:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return kept, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument(
+        "--logged-out", type=float, default=0.1, help="share of sealed users revoked"
+    )
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    os.environ["REZ_SESSION_MODE"] = "sealed"
+
+    import data
+    from data import InMemorySessionStore, open_sealed_session, seal_session
+
+    sample = [_session(i) for i in range(1000)]
+    plain = {s.session_id: s for s in sample}
+    store = InMemorySessionStore()
+    for s in sample:
+        store[s.session_id] = s
+    tokens = [seal_session(s) for s in sample]
+    ids = list(plain)
+
+    summarize("dict get", timeit(lambda: plain.get(random.choice(ids)), args.n))
+    summarize(
+        "InMemorySessionStore get",
+        timeit(lambda: store.get(random.choice(ids)), args.n),
+    )
+    summarize(
+        "open_sealed_session",
+        timeit(lambda: open_sealed_session(random.choice(tokens)), args.n),
+    )
+    print(f"sealed token length: {len(tokens[0])} characters")
+
+    def server_mode():
+        store = InMemorySessionStore()
+        for i in range(args.users):
+            session = _session(i)
+            store[session.session_id] = session
+        return store
+
+    def sealed_mode():
+        revoked = data.TokenBlacklist()
+        for i in range(int(args.users * args.logged_out)):
+            session = _session(i)
+            revoked.add(session.session_id, int(session.expiresAt.timestamp()))
+        return revoked
+
+    _, server_bytes = _traced(server_mode)
+    _, sealed_bytes = _traced(sealed_mode)
+    print(
+        f"{args.users} users, server sessions: {server_bytes / 2**20:.1f}MB "
+        f"({server_bytes / args.users:.0f}B per user)"
+    )
+    print(
+        f"{args.users} users, sealed with {args.logged_out:.0%} logged out: "
+        f"{sealed_bytes / 2**20:.1f}MB ({sealed_bytes / args.users:.0f}B per user)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Reaper cost with many live sessions and few expired ones.
+
+Compares the old full scan of every session with the expiry heap of
+InMemorySessionStore, and times sliding extensions.
+
+Usage:
+    python benchmarks/session_reaper.py [--sessions 50000] [--expired 100]
+"""
+
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta
+
+import _common  # noqa: F401
+from _common import summarize, timeit
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=50000)
+    parser.add_argument("--expired", type=int, default=100)
+    parser.add_argument("-n", type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    from data import InMemorySessionStore, SessionData
+
+    def populate():
+        store = InMemorySessionStore()
+        now = datetime.now()
+        for i in range(args.sessions):
+            expires = now + (
+                timedelta(seconds=-1) if i < args.expired else timedelta(minutes=15)
+            )
+            store[f"{i:032x}"] = SessionData(
+                "2117220001", f"{i:032x}", "c", expiresAt=expires
+            )
+        return store
+
+    def full_scan(store):
+        now = datetime.now()
+        expired = [
+            sid
+            for sid, data in store._sessions.items()
+            if data and now > data.expiresAt
+        ]
+        for sid in expired:
+            store.pop(sid)
+
+    for name, reap in (
+        ("full scan (before)", full_scan),
+        ("expiry heap (after)", lambda store: store.remove_expired()),
+    ):
+        samples = []
+        for _ in range(args.n):
+            store = populate()
+            start = time.perf_counter()
+            reap(store)
+            samples.append(time.perf_counter() - start)
+            assert len(store) == args.sessions - args.expired
+        summarize(f"reap {args.expired}/{args.sessions} {name}", samples)
+
+    store = populate()
+    expiry = datetime.now() + timedelta(minutes=25)
+    ids = iter(f"{i:032x}" for i in range(args.sessions) if i >= args.expired)
+    summarize(
+        "sliding extension (set_expiry)",
+        timeit(lambda: store.set_expiry(next(ids), expiry), args.sessions // 2),
+    )
+
+
+if __name__ == "__main__":
+    main()
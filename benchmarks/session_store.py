@@ -0,0 +1,60 @@
+"""Per operation cost of the session stores on the middleware hot path.
+
+Each call to a tool does one `get`, and some do a `set_expiry`. The plain
+dict that held sessions before is timed for reference.
+
+Usage:
+    python benchmarks/session_store.py [-n 20000] [--sessions 10000]
+"""
+
+import argparse
+import logging
+import random
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import _common  # noqa: F401
+from _common import summarize, timeit
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=20000)
+    parser.add_argument("--sessions", type=int, default=10000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    from data import InMemorySessionStore, SessionData, SQLiteSessionStore
+
+    tmp = tempfile.TemporaryDirectory()
+    stores = {
+        "dict": {},
+        "memory": InMemorySessionStore(),
+        "sqlite": SQLiteSessionStore(str(Path(tmp.name) / "sessions.db")),
+    }
+    ids = [f"{i:032x}" for i in range(args.sessions)]
+
+    for name, store in stores.items():
+        for sid in ids:
+            store[sid] = SessionData("2117220001", sid, "PHPSESSID=abcdef")
+
+        summarize(f"{name} get", timeit(lambda: store.get(random.choice(ids)), args.n))
+        if name != "dict":
+            expiry = datetime.now() + timedelta(minutes=20)
+            summarize(
+                f"{name} set_expiry",
+                timeit(lambda: store.set_expiry(random.choice(ids), expiry), args.n),
+            )
+
+            def login_logout():
+                store["bench"] = SessionData("2117220001", "bench", "PHPSESSID=x")
+                store.pop("bench")
+
+            summarize(f"{name} insert + pop", timeit(login_logout, args.n // 10))
+
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Cold start of the server.
+
+Starts ``src/main.py`` --runs times and reports how long it takes until the
+port accepts connections, how long the first HTML page (the invalid login
+link page) then takes to render, and the RSS once it is up. Run
+``python src/templating.py`` first to compare precompiled templates with
+compiling them on first use.
+
+Usage:
+    python benchmarks/startup.py [--runs 10] [--server-env KEY=VALUE ...]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE / "loadtest"))
+sys.path.insert(0, str(HERE.parent / "src"))
+
+from driver import ROOT, free_port, percentile, rss_kb, wait_for_port  # noqa: E402
+from templating import _compiled_is_fresh  # noqa: E402
+
+
+async def start_once(env: dict) -> dict:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = {
+        **env,
+        "REZ_BASE_URL": url,
+        "REZ_HOST": "127.0.0.1",
+        "REZ_PORT": str(port),
+    }
+    start = time.perf_counter()
+    rez = subprocess.Popen(
+        [sys.executable, "src/main.py"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        await wait_for_port(port, rez)
+        ready = time.perf_counter() - start
+        rss = rss_kb(rez.pid)
+
+        async with httpx.AsyncClient() as http:
+            page_start = time.perf_counter()
+            response = await http.get(f"{url}/auth/login", params={"token": "x"})
+            first_page = time.perf_counter() - page_start
+        assert "expired" in response.text, response.status_code
+
+        return {"ready_s": ready, "first_page_s": first_page, "rss_kb": rss}
+    finally:
+        rez.terminate()
+        rez.wait()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--server-env", action="append", default=[], metavar="KEY=VALUE"
+    )
+    parser.add_argument("-o", "--output")
+    args = parser.parse_args()
+
+    env = {
+        **os.environ,
+        "CIT_BASE_URL": "http://127.0.0.1:1",
+        "REZ_PREFETCH": "false",
+        **dict(item.split("=", 1) for item in args.server_env),
+    }
+    runs = [await start_once(env) for _ in range(args.runs)]
+
+    ready = [run["ready_s"] for run in runs]
+    first_page = [run["first_page_s"] for run in runs]
+    rss = [run["rss_kb"] for run in runs]
+    summary = {
+        "runs": args.runs,
+        "precompiled_templates": _compiled_is_fresh(),
+        "ready_p50_ms": percentile(ready, 0.5) * 1000,
+        "ready_max_ms": max(ready) * 1000,
+        "first_page_p50_ms": percentile(first_page, 0.5) * 1000,
+        "first_page_max_ms": max(first_page) * 1000,
+        "rss_p50_mb": percentile(rss, 0.5) / 1024,
+    }
+    print(
+        f"{args.runs} starts, templates "
+        f"{'precompiled' if summary['precompiled_templates'] else 'compiled on use'}"
+    )
+    print(
+        f"  port open     p50={summary['ready_p50_ms']:.0f}ms "
+        f"max={summary['ready_max_ms']:.0f}ms"
+    )
+    print(
+        f"  first page    p50={summary['first_page_p50_ms']:.1f}ms "
+        f"max={summary['first_page_max_ms']:.1f}ms"
+    )
+    print(f"  RSS when up   p50={summary['rss_p50_mb']:.1f}MB")
+
+    if args.output:
+        Path(args.output).write_text(
+            json.dumps({"summary": summary, "runs": runs}, indent=2)
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
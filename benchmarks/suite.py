@@ -0,0 +1,361 @@
+"""Offline micro-benchmark suite.
+
+Runs every registered benchmark against the fixtures in
+``benchmarks/fixtures`` and writes the results as JSON, so runs can be
+compared against each other.
+
+Usage:
+    python benchmarks/suite.py [-k gpa] [-n 200] [-o results.json]
+    python benchmarks/suite.py --compare base.json new.json
+
+Results go to ``benchmarks/results/<timestamp>-<commit>.json`` by default.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import _common
+from _common import summarize
+
+FIXTURES = _common.ROOT / "benchmarks" / "fixtures"
+RESULTS = _common.ROOT / "benchmarks" / "results"
+
+BENCHMARKS = {}
+
+
+def benchmark(name: str):
+    """Registers `fn(n) -> list[float]` returning per-iteration seconds."""
+
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+
+    return register
+
+
+def fixture(name: str) -> bytes:
+    return (FIXTURES / name).read_bytes()
+
+
+def sync_samples(fn, n: int, setup=None) -> list[float]:
+    samples = []
+    for _ in range(n):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def async_samples(fn, n: int, setup=None) -> list[float]:
+    async def run():
+        samples = []
+        for _ in range(n):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            await fn()
+            samples.append(time.perf_counter() - start)
+        return samples
+
+    return asyncio.run(run())
+
+
+# --- page parsing ----------------------------------------------------------
+
+
+@benchmark("parse.exam_result")
+def _(n):
+    import pages
+
+    html = fixture("exam_result.html").decode()
+    return sync_samples(lambda: pages.parse_result_page(html), n)
+
+
+@benchmark("parse.param_exam_hallticket")
+def _(n):
+    import pages
+
+    html = fixture("param_exam_hallticket.html").decode()
+    return sync_samples(lambda: pages.parse_hallticket_page(html), n)
+
+
+@benchmark("parse.personal")
+def _(n):
+    import pages
+
+    html = fixture("personal.html").decode()
+    return sync_samples(lambda: pages.parse_profile_page(html), n)
+
+
+# --- GPA extraction --------------------------------------------------------
+
+
+def _gpa_benchmark(pdf_name: str):
+    def run(n):
+        import gpa
+
+        pdf = fixture(pdf_name)
+        return sync_samples(lambda: gpa.extract_gpa(pdf), n, setup=gpa.gpa_memo.clear)
+
+    return run
+
+
+benchmark("gpa.result")(_gpa_benchmark("result.pdf"))
+benchmark("gpa.result_tj_array")(_gpa_benchmark("result_tj_array.pdf"))
+benchmark("gpa.result_hex_fallback")(_gpa_benchmark("result_hex.pdf"))
+
+
+# --- signer ----------------------------------------------------------------
+
+
+@benchmark("signer.generate_token")
+def _(n):
+    import signer
+
+    return sync_samples(lambda: signer.generate_token("0" * 32), n)
+
+
+@benchmark("signer.verify_token")
+def _(n):
+    import signer
+
+    token = signer.generate_token("0" * 32)
+    return sync_samples(lambda: signer.verify_token(token), n)
+
+
+# --- tools, with CIT replaced by the fixtures --------------------------------
+
+
+class _Context:
+    def __init__(self, session):
+        self.session = session
+        self.session_id = session.session_id
+
+    def get_state(self, key):
+        return self.session
+
+    def set_state(self, key, value):
+        pass
+
+
+def _offline_tools():
+    """Points the upstream client at the fixtures and returns a tool context."""
+    import httpx
+
+    import utils
+    from data import SessionData
+
+    routes = {
+        "/exam/exam_result.php": fixture("exam_result.html"),
+        "/exam/param_exam_hallticket.php": fixture("param_exam_hallticket.html"),
+        "/personal.php": fixture("personal.html"),
+        "/exam/result.php": fixture("result.pdf"),
+        "/exam/rpt_exam_hallticket.php": fixture("result.pdf"),
+    }
+
+    def handler(request):
+        return httpx.Response(200, content=routes[request.url.path])
+
+    utils._client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), base_url="http://cit.invalid"
+    )
+    return _Context(SessionData("2117220001", "0" * 32, "PHPSESSID=bench"))
+
+
+def _cold_caches():
+    import gpa
+    import pages
+
+    _new_session()
+    pages.parse_memo.clear()
+    gpa.gpa_memo.clear()
+
+
+def _new_session():
+    """Cold page and PDF caches, as for a new login, but warm parse memos."""
+    import pages
+
+    pages.page_cache.discard(lambda key: True)
+    pages.pdf_cache.clear()
+
+
+def _tool_benchmark(tool_name: str, *args, setup=_cold_caches):
+    def run(n):
+        import tools.hallticket
+        import tools.results
+        import tools.setup
+
+        ctx = _offline_tools()
+        tool = next(
+            getattr(module, tool_name)
+            for module in (tools.results, tools.hallticket, tools.setup)
+            if hasattr(module, tool_name)
+        )
+        return async_samples(lambda: tool(ctx, *args), n, setup=setup)
+
+    return run
+
+
+benchmark("tool.get_results")(_tool_benchmark("get_results"))
+benchmark("tool.get_result")(_tool_benchmark("get_result", "2025MAY"))
+benchmark("tool.get_all_results")(_tool_benchmark("get_all_results"))
+benchmark("tool.get_halltickets")(_tool_benchmark("get_halltickets"))
+benchmark("tool.get_profile")(_tool_benchmark("get_profile"))
+benchmark("tool.get_results.memoized")(
+    _tool_benchmark("get_results", setup=_new_session)
+)
+benchmark("tool.get_result.memoized")(
+    _tool_benchmark("get_result", "2025MAY", setup=_new_session)
+)
+benchmark("tool.get_profile.memoized")(
+    _tool_benchmark("get_profile", setup=_new_session)
+)
+
+
+def _archived_tool_benchmark(tool_name: str, *args):
+    """A result tool answered from the result archive, with cold caches."""
+
+    def run(n):
+        import tempfile
+
+        import tools.results
+        from archive import SQLiteResultArchive
+
+        disabled = tools.results.results_archive
+        with tempfile.TemporaryDirectory() as tmp:
+            archive = SQLiteResultArchive(f"{tmp}/results.db")
+            tools.results.results_archive = archive
+            try:
+                # the first call fills the archive
+                return _tool_benchmark(tool_name, *args)(n + 1)[1:]
+            finally:
+                archive.db.close()
+                tools.results.results_archive = disabled
+
+    return run
+
+
+benchmark("tool.get_result.archived")(_archived_tool_benchmark("get_result", "2025MAY"))
+benchmark("tool.get_all_results.archived")(_archived_tool_benchmark("get_all_results"))
+
+
+# --- AuthMiddleware --------------------------------------------------------
+
+
+@benchmark("middleware.on_call_tool")
+def _(n):
+    from types import SimpleNamespace
+
+    from data import SessionData, sessions
+    from main import AuthMiddleware
+
+    session = SessionData(
+        "2117220001",
+        "0" * 32,
+        "PHPSESSID=bench",
+        expiresAt=datetime.now() + timedelta(hours=1),
+    )
+    sessions[session.session_id] = session
+    mctx = SimpleNamespace(
+        message=SimpleNamespace(name="get_results", arguments={}),
+        fastmcp_context=_Context(session),
+    )
+    middleware = AuthMiddleware()
+
+    async def call_next(mctx):
+        return None
+
+    return async_samples(lambda: middleware.on_call_tool(mctx, call_next), n)
+
+
+# --- runner ----------------------------------------------------------------
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=_common.ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run(selected: list[str], n: int) -> dict:
+    logging.disable(logging.INFO)
+    results = {}
+    for name in selected:
+        fn = BENCHMARKS[name]
+        fn(max(n // 10, 3))  # warm up imports, pools and caches of the code
+        results[name] = summarize(name, fn(n))
+
+    return {
+        "commit": _git_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "iterations": n,
+        "results": results,
+    }
+
+
+def compare(base_path: str, new_path: str):
+    base = json.loads(Path(base_path).read_text())
+    new = json.loads(Path(new_path).read_text())
+    print(f"{'benchmark':<32} {'base p50':>10} {'new p50':>10} {'change':>8}")
+    for name, result in new["results"].items():
+        before = base["results"].get(name)
+        if before is None:
+            print(f"{name:<32} {'-':>10} {result['p50_ms']:>9.3f}ms {'new':>8}")
+            continue
+        change = (result["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100
+        print(
+            f"{name:<32} {before['p50_ms']:>9.3f}ms {result['p50_ms']:>9.3f}ms "
+            f"{change:>+7.1f}%"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-k", help="only run benchmarks whose name contains this")
+    parser.add_argument("-n", type=int, default=200)
+    parser.add_argument("-o", "--output")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"))
+    parser.add_argument("--list", action="store_true")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    selected = [name for name in BENCHMARKS if not args.k or args.k in name]
+    if args.list:
+        print("\n".join(selected))
+        return
+
+    report = run(selected, args.n)
+
+    output = Path(args.output) if args.output else None
+    if output is None:
+        RESULTS.mkdir(exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS / f"{stamp}-{report['commit'] or 'nogit'}.json"
+    output.write_text(json.dumps(report, indent=2))
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Tool calls under a spike, with and without admission control.
+
+Sends --spike `get_result` calls at once through `AuthMiddleware`, each
+for a different session, against the fixtures served with --latency ms of
+simulated CIT latency. The parse and GPA memos are off, as they would be
+for as many different students, so every call fetches and parses the
+result page and PDF. This runs once with the `pdf` tool class
+unlimited and once with REZ_PDF_TOOLS_MAX_IN_FLIGHT and its queue, and
+reports the latency of the calls that succeeded and how many were turned
+away, and how fast.
+
+Usage:
+    python benchmarks/tool_admission.py [--spike 300] [--latency 50] [--max-queue 64] [--queue-timeout 5]
+"""
+
+import argparse
+import asyncio
+import logging
+import secrets
+import time
+from types import SimpleNamespace
+
+import _common  # noqa: F401
+from _common import summarize
+from suite import _cold_caches, _Context, fixture
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--spike", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=50)
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--queue-timeout", type=float, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    import httpx
+
+    import gpa
+    import main as server
+    import pages
+    import utils
+    from admission import AdmissionError, admission
+    from config import REZConfig
+    from data import SessionData
+    from tools.results import get_result
+
+    routes = {
+        "/exam/exam_result.php": fixture("exam_result.html"),
+        "/exam/result.php": fixture("result.pdf"),
+    }
+
+    async def handler(request):
+        await asyncio.sleep(args.latency / 1000)
+        return httpx.Response(200, content=routes[request.url.path])
+
+    utils._client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), base_url="http://cit.invalid"
+    )
+    pages.parse_memo.maxsize = gpa.gpa_memo.maxsize = 0
+
+    server.AuthMiddleware.authorize = staticmethod(lambda mctx: None)
+    middleware = server.AuthMiddleware()
+    mctx = SimpleNamespace(message=SimpleNamespace(name="get_result"))
+
+    limiter = admission["pdf"]
+    for name, max_in_flight, max_queue in (
+        ("unlimited", args.spike, args.spike),
+        (
+            f"{REZConfig.REZ_PDF_TOOLS_MAX_IN_FLIGHT} in flight, "
+            f"{args.max_queue} queued",
+            REZConfig.REZ_PDF_TOOLS_MAX_IN_FLIGHT,
+            args.max_queue,
+        ),
+    ):
+        limiter.max_in_flight = max_in_flight
+        limiter.max_queue = max_queue
+        limiter.queue_timeout = args.queue_timeout
+        _cold_caches()
+        served, turned_away = [], []
+
+        async def one():
+            ctx = _Context(
+                SessionData("2117220001", secrets.token_hex(16), "PHPSESSID=bench")
+            )
+
+            async def call_next(mctx):
+                return await get_result(ctx, "2025MAY")
+
+            start = time.perf_counter()
+            try:
+                await middleware.on_call_tool(mctx, call_next)
+                served.append(time.perf_counter() - start)
+            except AdmissionError:
+                turned_away.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.spike)))
+        elapsed = time.perf_counter() - start
+
+        summarize(f"{name}: served", served)
+        if turned_away:
+            summarize(f"{name}: turned away", turned_away)
+        print(
+            f"  -> {len(served)} served, {len(turned_away)} turned away "
+            f"in {elapsed:.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,57 @@
+"""Per call latency of a fresh client per request vs the shared pooled client.
+
+Usage:
+    python benchmarks/upstream_client.py [--url https://cit.example] [-n 200]
+
+Without ``--url`` a local keep-alive server is used. Point it at a TLS host
+to see the handshake savings, which is where most of the difference is.
+"""
+
+import argparse
+import asyncio
+import logging
+
+import _common
+from _common import atimeit, serve_static, summarize
+
+import httpx
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url")
+    parser.add_argument("--path", default="/")
+    parser.add_argument("-n", type=int, default=200)
+    args = parser.parse_args()
+
+    base_url = args.url
+    if base_url is None:
+        base_url, _ = serve_static(b"<html>" + b"x" * 4096 + b"</html>")
+
+    _common.os.environ["CIT_BASE_URL"] = base_url
+    logging.disable(logging.INFO)
+
+    from config import REZConfig
+    import utils
+
+    REZConfig.CIT_BASE_URL = base_url
+
+    async def fresh_client():
+        async with httpx.AsyncClient(
+            timeout=30, base_url=base_url, verify=False
+        ) as client:
+            (await client.get(args.path)).raise_for_status()
+
+    async def shared_client():
+        await utils.call(args.path)
+
+    await shared_client()  # open the pooled connection once
+    summarize(
+        "fresh AsyncClient per call (before)", await atimeit(fresh_client, args.n)
+    )
+    summarize("shared pooled client (after)", await atimeit(shared_client, args.n))
+    await utils.close_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
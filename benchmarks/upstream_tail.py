@@ -0,0 +1,90 @@
+"""Tail latency of CIT calls with retries and hedged requests.
+
+Calls the result page of the fake CIT server (in process) -n times, with
+--concurrency calls at once. A share of its responses is very slow or a
+503. This runs once with neither retries nor hedging, once with retries,
+and once with retries and hedging, and reports p50/p95/p99 and failures.
+
+Usage:
+    python benchmarks/upstream_tail.py [-n 2000] [--slow-rate 0.03] [--error-rate 0.02]
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+
+import _common
+from _common import summarize
+
+sys.path.insert(0, str(_common.ROOT / "benchmarks" / "loadtest"))
+
+PATH = "/exam/exam_result.php"
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=20)
+    parser.add_argument("--jitter", type=float, default=5)
+    parser.add_argument("--slow-rate", type=float, default=0.03)
+    parser.add_argument("--slow-ms", type=float, default=1000)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    import httpx
+
+    import policy
+    import utils
+    from fake_cit import create_app
+
+    app = create_app(
+        args.latency,
+        args.jitter,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+        error_rate=args.error_rate,
+    )
+    utils._client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://cit.invalid"
+    )
+    page_policy = policy.policy_for(PATH)
+
+    for name, retries, hedge in (
+        ("no retries, no hedging", 0, False),
+        ("retries", 2, False),
+        ("retries and hedging", 2, True),
+    ):
+        random.seed(1)
+        page_policy.retries = retries
+        page_policy.hedge = hedge
+        policy.latencies = utils.latencies = policy.LatencyTracker()
+        gate = asyncio.Semaphore(args.concurrency)
+        samples, failures = [], 0
+
+        async def one():
+            nonlocal failures
+            async with gate:
+                start = time.perf_counter()
+                try:
+                    await utils.call(PATH, addtional_headers={"Cookie": "PHPSESSID=x"})
+                    samples.append(time.perf_counter() - start)
+                except Exception:
+                    failures += 1
+
+        await asyncio.gather(*(one() for _ in range(args.n)))
+        summarize(name, samples)
+        samples.sort()
+        p99 = samples[int(len(samples) * 0.99) - 1] * 1000
+        print(
+            f"  -> p99={p99:.1f}ms max={samples[-1] * 1000:.1f}ms "
+            f"failed={failures} hedges={policy.latencies.hedges}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,286 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+import httpx
+
+from config import REZConfig
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionError(Exception):
+    """A request turned away before reaching CIT. `retry_after` is in seconds."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Limiter:
+    """
+    Caps the requests running at once, queueing the rest in arrival order.
+
+    A queued request gives up with `AdmissionError` after `queue_timeout`
+    seconds, and new requests are refused right away once `max_queue` are
+    waiting. A finished request hands its slot straight to the oldest
+    waiter, so a newcomer can never overtake the queue.
+    """
+
+    def __init__(
+        self, name: str, max_in_flight: int, max_queue: int, queue_timeout: float
+    ):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.rejected = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self):
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise self._busy()
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await future
+
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                self.release()  # the slot arrived just as we gave up on it
+            else:
+                future.cancel()
+                try:
+                    self._waiters.remove(future)
+                except ValueError:
+                    pass
+
+            if isinstance(e, TimeoutError):
+                self.rejected += 1
+                raise self._busy() from None
+            raise
+
+    def _busy(self) -> AdmissionError:
+        return AdmissionError(
+            f"{self.name} is busy, please try again in "
+            f"{math.ceil(self.queue_timeout)} seconds.",
+            self.queue_timeout,
+        )
+
+    def release(self):
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)  # in_flight carries over to the waiter
+                return
+
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+        }
+
+
+class CircuitBreaker:
+    """
+    Stops calling CIT after `failure_threshold` failures in a row.
+
+    While open every request fails at once. After `reset_timeout` seconds a
+    single probe request is let through (half open), and its outcome closes
+    the breaker again or keeps it open for another `reset_timeout`.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def before_request(self):
+        if self.state == self.CLOSED:
+            return
+
+        retry_after = self._opened_at + self.reset_timeout - time.monotonic()
+        if self.state == self.OPEN and retry_after <= 0:
+            logger.info("%s circuit half open, sending a probe request", self.name)
+            self.state = self.HALF_OPEN
+
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return
+
+        retry_after = max(retry_after, 1.0)
+        raise AdmissionError(
+            f"{self.name} is not responding right now, "
+            f"please try again in {math.ceil(retry_after)} seconds.",
+            retry_after,
+        )
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info("%s circuit closed", self.name)
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or (
+            self.state == self.CLOSED and self.failures >= self.failure_threshold
+        ):
+            logger.warning(
+                "%s circuit open after %s failures, failing fast for %ss",
+                self.name,
+                self.failures,
+                self.reset_timeout,
+            )
+            self.state = self.OPEN
+            self.opened += 1
+            self._opened_at = time.monotonic()
+        self._probing = False
+
+    def record_skipped(self):
+        """The admitted request never got an answer from CIT either way."""
+        self._probing = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opened": self.opened,
+        }
+
+
+def _is_failure(error: BaseException) -> bool:
+    """Whether an error means CIT itself is unhealthy."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+class Upstream:
+    """The limiter and circuit breaker every request to CIT goes through."""
+
+    def __init__(self, limiter: Limiter, breaker: CircuitBreaker):
+        self.limiter = limiter
+        self.breaker = breaker
+
+    @asynccontextmanager
+    async def request(self):
+        """
+        Admits one request to CIT, raising `AdmissionError` when it can't go.
+
+        Transport errors, timeouts and 5xx `HTTPStatusError`s raised in the
+        block count as failures for the breaker, anything else as a success.
+        """
+        self.breaker.before_request()
+        try:
+            async with self.limiter.slot():
+                # the breaker may have opened while this request was queued
+                if self.breaker.state == CircuitBreaker.OPEN:
+                    self.breaker.before_request()
+                yield
+
+        except AdmissionError:
+            self.breaker.record_skipped()
+            raise
+
+        except BaseException as e:
+            if _is_failure(e):
+                self.breaker.record_failure()
+            elif not isinstance(e, asyncio.CancelledError):
+                self.breaker.record_success()
+            else:
+                self.breaker.record_skipped()
+            raise
+
+        self.breaker.record_success()
+
+    def stats(self) -> dict:
+        return {**self.limiter.stats(), "breaker": self.breaker.stats()}
+
+
+upstream = Upstream(
+    Limiter(
+        "CIT",
+        max_in_flight=REZConfig.REZ_UPSTREAM_MAX_IN_FLIGHT,
+        max_queue=REZConfig.REZ_UPSTREAM_MAX_QUEUE,
+        queue_timeout=REZConfig.REZ_UPSTREAM_QUEUE_TIMEOUT,
+    ),
+    CircuitBreaker(
+        "CIT",
+        failure_threshold=REZConfig.REZ_BREAKER_FAILURES,
+        reset_timeout=REZConfig.REZ_BREAKER_RESET,
+    ),
+)
+
+
+def _admission(max_in_flight: int) -> Limiter:
+    return Limiter(
+        "The server",
+        max_in_flight=max_in_flight,
+        max_queue=REZConfig.REZ_ADMISSION_MAX_QUEUE,
+        queue_timeout=REZConfig.REZ_ADMISSION_QUEUE_TIMEOUT,
+    )
+
+
+# Work this server takes on at once, by class: tools that fetch and parse
+# one page, tools that also read result PDFs, and `/pdf/*` downloads.
+admission = {
+    "page": _admission(REZConfig.REZ_PAGE_TOOLS_MAX_IN_FLIGHT),
+    "pdf": _admission(REZConfig.REZ_PDF_TOOLS_MAX_IN_FLIGHT),
+    "download": _admission(REZConfig.REZ_DOWNLOADS_MAX_IN_FLIGHT),
+}
+
+# `login` and `logout` never wait, they do no more than hand out a link or
+# drop a session.
+TOOL_CLASSES = {
+    "get_profile": "page",
+    "get_results": "page",
+    "get_halltickets": "page",
+    "download_result": "page",
+    "download_hallticket": "page",
+    "download_bundle": "page",
+    "get_result": "pdf",
+    "get_all_results": "pdf",
+}
+
+
+def tool_admission(tool: str) -> Limiter | None:
+    """The limiter a call of `tool` goes through, None to run it right away."""
+    tool_class = TOOL_CLASSES.get(tool)
+    return admission[tool_class] if tool_class else None
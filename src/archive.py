@@ -0,0 +1,106 @@
+import hashlib
+import json
+import logging
+import time
+
+from config import REZConfig
+from db import SQLiteDatabase
+from metrics import ARCHIVE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+
+class ResultArchive:
+    """
+    Parsed `get_result` output, keyed by register number and exam code.
+
+    Published results rarely change, so a result is kept with a hash of the
+    result table it was built from, and handed out again as long as the
+    result page shows the same table. A changed table, such as a revaluation,
+    makes the tool build the result again from the PDF.
+
+    This base class keeps nothing, see `SQLiteResultArchive`.
+    """
+
+    @staticmethod
+    def _digest(source) -> bytes:
+        return hashlib.blake2b(
+            json.dumps(source, separators=(",", ":")).encode(), digest_size=16
+        ).digest()
+
+    def lookup(
+        self, register_no: str, exam_code: str, source
+    ) -> tuple[str, dict | None]:
+        """
+        Returns the outcome, `hit`, `changed` or `miss`, and the archived
+        result on a hit.
+        """
+        return "miss", None
+
+    def put(self, register_no: str, exam_code: str, source, result: dict):
+        pass
+
+    def __len__(self) -> int:
+        return 0
+
+
+class SQLiteResultArchive(ResultArchive):
+    """A `ResultArchive` in a SQLite file, shared by every worker on the host."""
+
+    def __init__(self, path: str):
+        self.db = SQLiteDatabase(
+            path,
+            """CREATE TABLE IF NOT EXISTS results (
+                register_no TEXT NOT NULL,
+                exam_code TEXT NOT NULL,
+                source_hash BLOB NOT NULL,
+                result TEXT NOT NULL,
+                archived_at REAL NOT NULL,
+                PRIMARY KEY (register_no, exam_code)
+            )""",
+        )
+
+    def lookup(
+        self, register_no: str, exam_code: str, source
+    ) -> tuple[str, dict | None]:
+        row = self.db.conn.execute(
+            "SELECT source_hash, result FROM results WHERE register_no = ? AND exam_code = ?",
+            (register_no, exam_code),
+        ).fetchone()
+        if row is None:
+            ARCHIVE_LOOKUPS.inc(1, "miss")
+            return "miss", None
+
+        if row[0] != self._digest(source):
+            ARCHIVE_LOOKUPS.inc(1, "changed")
+            logger.info(
+                "Result of %s changed | Register No: %s", exam_code, register_no
+            )
+            return "changed", None
+
+        ARCHIVE_LOOKUPS.inc(1, "hit")
+        return "hit", json.loads(row[1])
+
+    def put(self, register_no: str, exam_code: str, source, result: dict):
+        self.db.conn.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+            (
+                register_no,
+                exam_code,
+                self._digest(source),
+                json.dumps(result),
+                time.time(),
+            ),
+        )
+
+    def __len__(self) -> int:
+        return self.db.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+def create_result_archive() -> ResultArchive:
+    if REZConfig.REZ_RESULT_ARCHIVE:
+        return SQLiteResultArchive(REZConfig.REZ_RESULT_ARCHIVE_DB)
+    return ResultArchive()
+
+
+results_archive = create_result_archive()
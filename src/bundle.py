@@ -0,0 +1,93 @@
+import asyncio
+import io
+import logging
+import zipfile
+from typing import AsyncIterator
+
+from config import REZConfig
+from pages import pdf
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_KINDS = ("result", "hallticket")
+
+# Stands in for the exam code in a `/pdf/bundle` link token, `*` never
+# appears in a real exam code.
+BUNDLE_PREFIX = "*"
+
+
+class _Sink(io.RawIOBase):
+    """An unseekable file that keeps what `ZipFile` writes until it is sent."""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> list[bytes]:
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+async def zip_pdfs(session, kind: str, files: dict[str, str]) -> AsyncIterator[bytes]:
+    """
+    Streams a ZIP of the `kind` PDFs of `files`, which maps exam codes to
+    file names in the ZIP.
+
+    REZ_BUNDLE_FANOUT PDFs are fetched at once and each one is written to
+    the ZIP as soon as it arrives. PDFs found in `pdf_cache` are sent from
+    there, the others are not added to it, so a bundle holds at most about
+    twice that many PDFs in memory however many it has, and doesn't evict
+    the PDFs of other students. PDFs are compressed already, so they are
+    stored as they are. Exam codes whose PDF couldn't
+    be fetched are listed in a MISSING.txt at the end.
+    """
+    fanout = max(1, min(REZConfig.REZ_BUNDLE_FANOUT, len(files)))
+    pending = iter(files)  # shared by the workers
+    arrived: asyncio.Queue[tuple[str, bytes | None]] = asyncio.Queue(maxsize=fanout)
+
+    async def worker():
+        for exam_code in pending:
+            try:
+                content = await pdf(session, kind, exam_code, store=False)
+            except Exception as e:
+                logger.error(
+                    "Couldn't get the %s PDF of %s for a bundle: %s", kind, exam_code, e
+                )
+                content = None
+            await arrived.put((exam_code, content))
+
+    workers = [asyncio.create_task(worker()) for _ in range(fanout)]
+    sink = _Sink()
+    missing = []
+    try:
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as bundle:
+            for _ in files:
+                exam_code, content = await arrived.get()
+                if content is None:
+                    missing.append(exam_code)
+                    continue
+
+                bundle.writestr(files[exam_code], content)
+                for chunk in sink.drain():
+                    yield chunk
+
+            if missing:
+                bundle.writestr(
+                    "MISSING.txt",
+                    f"Couldn't download the {kind} of {', '.join(sorted(missing))}, "
+                    "please try again later.\n",
+                )
+
+        for chunk in sink.drain():
+            yield chunk
+
+    finally:
+        for task in workers:
+            task.cancel()
@@ -0,0 +1,232 @@
+import asyncio
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+
+def _consume_exception(future: asyncio.Future):
+    # A shared fetch may fail after every waiter has gone away.
+    if not future.cancelled():
+        future.exception()
+
+
+class _SingleFlight(ABC):
+    """
+    Base for the caches below. Concurrent `get_or_fetch` calls for a key
+    that is not cached share a single in-flight fetch, whose result is then
+    stored with `set`. Failed fetches are not cached.
+    """
+
+    _MISSING = object()
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    @abstractmethod
+    def get(self, key: Hashable, default=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any):
+        raise NotImplementedError
+
+    def _lookup(self, key: Hashable):
+        return self.get(key, self._MISSING)
+
+    def is_fetching(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]):
+        value = self._lookup(key)
+        if value is not self._MISSING:
+            return value
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(key, fetch))
+            future.add_done_callback(_consume_exception)
+            self._inflight[key] = future
+
+        # shield so a cancelled caller doesn't cancel the fetch for the others
+        return await asyncio.shield(future)
+
+    async def _fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]):
+        try:
+            value = await fetch()
+            self.set(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+
+class TTLCache(_SingleFlight):
+    """LRU cache of at most `maxsize` entries that expire after `ttl` seconds."""
+
+    def __init__(self, ttl: float, maxsize: int):
+        super().__init__()
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return default
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def discard(self, predicate: Callable[[Hashable], bool]):
+        for key in [key for key in self._entries if predicate(key)]:
+            del self._entries[key]
+
+
+class ByteLRUCache(_SingleFlight):
+    """
+    LRU cache of `bytes` values bounded by their total size, which expire
+    after `ttl` seconds if given.
+
+    Values larger than `max_item_bytes` are returned but never stored.
+    `hits` counts lookups answered without a fetch, including callers that
+    joined an in-flight fetch, and `misses` counts the fetches made.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        max_item_bytes: int | None = None,
+        ttl: float | None = None,
+    ):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes or max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, bytes]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and time.monotonic() < entry[0]
+
+    def get(self, key: Hashable, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            self.remove(key)
+            return default
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: bytes):
+        if len(value) > self.max_item_bytes:
+            return
+
+        self.remove(key)
+        expires_at = math.inf if self.ttl is None else time.monotonic() + self.ttl
+        self._entries[key] = (expires_at, value)
+        self.size += len(value)
+
+        while self.size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def _lookup(self, key: Hashable):
+        value = self.get(key, self._MISSING)
+        if value is self._MISSING and key not in self._inflight:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return value
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+class LRUMemo:
+    """
+    LRU memo of values derived from content, keyed by a digest of the content.
+
+    Unlike the caches above nothing expires, since the same content always
+    gives the same value. `hits` and `misses` count the lookups.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default=None):
+        if key not in self._entries:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def set(self, key: Hashable, value: Any):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.maxsize,
+        }
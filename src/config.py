@@ -11,9 +11,138 @@ def _get_env(var: str, default=None):
     return value
 
 
+def _get_bool(var: str, default: bool = False) -> bool:
+    value = str(_get_env(var, str(default)))
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _load_secret_keys() -> dict[str, bytes]:
+    """
+    Token signing keys by key id. The first key signs new tokens and every
+    key verifies them, so a new key can be put first while tokens signed
+    with the old one are still in use.
+
+    Read from REZ_SECRET_KEY_FILE (one `<key id> <secret>` per line) or
+    REZ_SECRET_KEY (id REZ_SECRET_KEY_ID). Without either, a random key is
+    made and tokens only work on this process until it restarts.
+    """
+    keys = {}
+    path = os.getenv("REZ_SECRET_KEY_FILE")
+    if path:
+        with open(path) as f:
+            for line in f:
+                if line.strip() and not line.lstrip().startswith("#"):
+                    kid, _, secret = line.strip().partition(" ")
+                    keys[kid] = secret.strip().encode()
+    elif os.getenv("REZ_SECRET_KEY"):
+        keys[_get_env("REZ_SECRET_KEY_ID", "k1")] = _get_env("REZ_SECRET_KEY").encode()
+    else:
+        keys["local"] = os.urandom(32)
+
+    for kid, secret in keys.items():
+        if not kid or "." in kid or not secret:
+            raise Exception(
+                f"Invalid signing key '{kid}', ids can't be empty or hold a '.'"
+            )
+
+    if not keys:
+        raise Exception(f"No signing keys found in REZ_SECRET_KEY_FILE '{path}'")
+    return keys
+
+
 class REZConfig:
     CIT_BASE_URL = _get_env("CIT_BASE_URL")
     REZ_BASE_URL = _get_env("REZ_BASE_URL")
     REZ_HOST = _get_env("REZ_HOST", "0.0.0.0")
     REZ_PORT = int(_get_env("REZ_PORT", 4567))
-    SECRET_KEY = os.urandom(32)
+    SECRET_KEYS = _load_secret_keys()
+    # uvicorn worker processes, 0 starts one per CPU core
+    REZ_WORKERS = int(_get_env("REZ_WORKERS", 1)) or os.cpu_count()
+
+    # Upstream (CIT) HTTP client pool
+    REZ_HTTP_MAX_CONNECTIONS = int(_get_env("REZ_HTTP_MAX_CONNECTIONS", 100))
+    REZ_HTTP_MAX_KEEPALIVE = int(_get_env("REZ_HTTP_MAX_KEEPALIVE", 20))
+    REZ_HTTP_KEEPALIVE_EXPIRY = float(_get_env("REZ_HTTP_KEEPALIVE_EXPIRY", 30))
+    REZ_HTTP2 = _get_bool("REZ_HTTP2")
+    # Default timeouts of a request to CIT (see policy.py for the per path
+    # ones), the retries of failed GETs and the base of their jittered
+    # backoff, and whether slow GETs are hedged with a second request
+    REZ_HTTP_CONNECT_TIMEOUT = float(_get_env("REZ_HTTP_CONNECT_TIMEOUT", 5))
+    REZ_HTTP_READ_TIMEOUT = float(_get_env("REZ_HTTP_READ_TIMEOUT", 20))
+    REZ_HTTP_TOTAL_TIMEOUT = float(_get_env("REZ_HTTP_TOTAL_TIMEOUT", 30))
+    REZ_HTTP_RETRIES = int(_get_env("REZ_HTTP_RETRIES", 2))
+    REZ_HTTP_RETRY_BACKOFF = float(_get_env("REZ_HTTP_RETRY_BACKOFF", 0.2))
+    REZ_HTTP_HEDGE = _get_bool("REZ_HTTP_HEDGE")
+
+    # Per-session cache of parsed CIT pages
+    REZ_PAGE_CACHE_TTL = float(_get_env("REZ_PAGE_CACHE_TTL", 120))
+    REZ_PAGE_CACHE_SIZE = int(_get_env("REZ_PAGE_CACHE_SIZE", 1024))
+
+    # Shared in-memory cache of result and hallticket PDFs
+    REZ_PDF_CACHE_BYTES = int(_get_env("REZ_PDF_CACHE_BYTES", 64 * 1024 * 1024))
+    REZ_PDF_CACHE_MAX_ITEM_BYTES = int(
+        _get_env("REZ_PDF_CACHE_MAX_ITEM_BYTES", 4 * 1024 * 1024)
+    )
+    # CIT replaces a result PDF after a revaluation, so a cached one is only
+    # served for this many seconds
+    REZ_PDF_CACHE_TTL = float(_get_env("REZ_PDF_CACHE_TTL", 600))
+    # Stream uncached PDFs from CIT to the client instead of buffering them
+    REZ_PDF_STREAMING = _get_bool("REZ_PDF_STREAMING", True)
+
+    # Logging: level, "text" or "json" lines, and the share of INFO records
+    # kept per logger, e.g. "utils:0.1,tools:0.5" (empty keeps everything)
+    REZ_LOG_LEVEL = _get_env("REZ_LOG_LEVEL", "INFO")
+    REZ_LOG_FORMAT = _get_env("REZ_LOG_FORMAT", "text")
+    REZ_LOG_SAMPLE = os.getenv("REZ_LOG_SAMPLE", "")
+
+    # HTML parsing: tree builder ("html.parser" or "lxml"), worker pool kind
+    # ("thread" or "process") and size. 0 workers parses on the event loop.
+    REZ_HTML_PARSER = _get_env("REZ_HTML_PARSER", "html.parser")
+    REZ_PARSE_EXECUTOR = _get_env("REZ_PARSE_EXECUTOR", "thread")
+    REZ_PARSE_WORKERS = int(_get_env("REZ_PARSE_WORKERS", "2"))
+    # Parsed pages remembered by a hash of their HTML, across sessions
+    REZ_PARSE_MEMO_SIZE = int(_get_env("REZ_PARSE_MEMO_SIZE", 1024))
+
+    # Where sessions live: "server" keeps them in the session store below,
+    # "sealed" hands each client an encrypted token holding its session
+    REZ_SESSION_MODE = _get_env("REZ_SESSION_MODE", "server")
+    # Lifetime of a sealed session, they can't be extended like stored ones
+    REZ_SEALED_SESSION_TTL = int(_get_env("REZ_SEALED_SESSION_TTL", 3600))
+    # Session store: "memory" (single worker) or "sqlite" (shared on the host)
+    REZ_SESSION_STORE = _get_env("REZ_SESSION_STORE", "memory")
+    REZ_SESSION_DB = _get_env("REZ_SESSION_DB", "rez-sessions.db")
+    # Longest the session reaper sleeps when no session is about to expire
+    REZ_SESSION_REAP_INTERVAL = float(_get_env("REZ_SESSION_REAP_INTERVAL", 60))
+
+    # Admission to CIT: requests in flight at once, how many may queue behind
+    # them and for how long, and the circuit breaker that fails fast after
+    # REZ_BREAKER_FAILURES failures in a row for REZ_BREAKER_RESET seconds.
+    REZ_UPSTREAM_MAX_IN_FLIGHT = int(_get_env("REZ_UPSTREAM_MAX_IN_FLIGHT", 32))
+    REZ_UPSTREAM_MAX_QUEUE = int(_get_env("REZ_UPSTREAM_MAX_QUEUE", 256))
+    REZ_UPSTREAM_QUEUE_TIMEOUT = float(_get_env("REZ_UPSTREAM_QUEUE_TIMEOUT", 10))
+    REZ_BREAKER_FAILURES = int(_get_env("REZ_BREAKER_FAILURES", 5))
+    REZ_BREAKER_RESET = float(_get_env("REZ_BREAKER_RESET", 30))
+
+    # Admission to this server: tool calls in flight at once by class (page
+    # tools fetch and parse one HTML page, PDF tools also read result PDFs),
+    # `/pdf/*` downloads in flight, and how many calls of each may queue
+    # behind them and for how long before they are turned away.
+    REZ_PAGE_TOOLS_MAX_IN_FLIGHT = int(_get_env("REZ_PAGE_TOOLS_MAX_IN_FLIGHT", 32))
+    REZ_PDF_TOOLS_MAX_IN_FLIGHT = int(_get_env("REZ_PDF_TOOLS_MAX_IN_FLIGHT", 8))
+    REZ_DOWNLOADS_MAX_IN_FLIGHT = int(_get_env("REZ_DOWNLOADS_MAX_IN_FLIGHT", 16))
+    REZ_ADMISSION_MAX_QUEUE = int(_get_env("REZ_ADMISSION_MAX_QUEUE", 64))
+    REZ_ADMISSION_QUEUE_TIMEOUT = float(_get_env("REZ_ADMISSION_QUEUE_TIMEOUT", 5))
+
+    # Result PDFs downloaded at once by `get_all_results`
+    REZ_RESULT_FANOUT = int(_get_env("REZ_RESULT_FANOUT", 4))
+    # PDFs downloaded at once for a `/pdf/bundle` ZIP
+    REZ_BUNDLE_FANOUT = int(_get_env("REZ_BUNDLE_FANOUT", 4))
+    # Keep parsed results in a SQLite file, so later logins of a student
+    # don't download and read the result PDFs again
+    REZ_RESULT_ARCHIVE = _get_bool("REZ_RESULT_ARCHIVE", False)
+    REZ_RESULT_ARCHIVE_DB = _get_env("REZ_RESULT_ARCHIVE_DB", "rez-results.db")
+
+    # Load the profile, result and hallticket pages right after login, with
+    # at most REZ_PREFETCH_CONCURRENCY page prefetches running at once
+    REZ_PREFETCH = _get_bool("REZ_PREFETCH", True)
+    REZ_PREFETCH_CONCURRENCY = int(_get_env("REZ_PREFETCH_CONCURRENCY", 8))
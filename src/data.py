@@ -1,14 +1,484 @@
+import hashlib
+from abc import ABC, abstractmethod
+import heapq
+import json
+import logging
+import time
 from datetime import datetime, timedelta
 
+from config import REZConfig
+from db import SQLiteDatabase
+from fastmcp.server.dependencies import get_http_headers
+from signer import generate_token, seal, sealed_expiry, token_expiry, unseal
+
+logger = logging.getLogger(__name__)
+
 
 class SessionData:
-    def __init__(self, roll_no: str, session_id: str, cookie: str):
+    def __init__(
+        self,
+        roll_no: str,
+        session_id: str,
+        cookie: str,
+        createdAt: datetime | None = None,
+        expiresAt: datetime | None = None,
+    ):
         self.register_no: str = roll_no
         self.session_id: str = session_id
         self.cookie: str = cookie
-        self.createdAt: datetime = datetime.now()
-        self.expiresAt: datetime = datetime.now() + timedelta(minutes=15)
+        self.createdAt: datetime = createdAt or datetime.now()
+        self.expiresAt: datetime = expiresAt or datetime.now() + timedelta(minutes=15)
+
+
+class SessionStore(ABC):
+    """
+    Where logged in sessions live, keyed by MCP session id.
+
+    Supports the dict operations the server uses (`get`, `in`, `[]`, `del`,
+    `len`). A `SessionData` returned by a store is a snapshot, so expiry
+    changes must go through `set_expiry` to be seen by other workers.
+    """
+
+    @abstractmethod
+    def get(self, session_id: str, default=None) -> SessionData | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def __setitem__(self, session_id: str, session: SessionData):
+        raise NotImplementedError
+
+    @abstractmethod
+    def __delitem__(self, session_id: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def pop(self, session_id: str, default=None) -> SessionData | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_expiry(self, session_id: str, expires_at: datetime):
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove_expired(self) -> int:
+        """Removes the sessions that have expired and returns how many."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def next_expiry(self) -> float | None:
+        """Seconds until the earliest session expires, None without sessions."""
+        raise NotImplementedError
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def __getitem__(self, session_id: str) -> SessionData:
+        session = self.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+        return session
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Sessions in a dict of this process. Only usable with a single worker.
+
+    Expiry is indexed by a min-heap of (deadline, session id) on the
+    monotonic clock. Extending a session pushes a new entry and leaves the
+    old one to be skipped when popped, so both extending and reaping cost
+    O(log n) per session touched rather than a scan of every session.
+    """
+
+    def __init__(self):
+        self._sessions: dict[str, SessionData] = {}
+        self._deadlines: dict[str, float] = {}
+        self._heap: list[tuple[float, str]] = []
+
+    def _schedule(self, session_id: str, expires_at: datetime):
+        deadline = time.monotonic() + (expires_at - datetime.now()).total_seconds()
+        self._deadlines[session_id] = deadline
+        heapq.heappush(self._heap, (deadline, session_id))
+
+        # drop stale entries once they outnumber the live ones
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._heap = [(d, sid) for sid, d in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+    def get(self, session_id: str, default=None) -> SessionData | None:
+        return self._sessions.get(session_id, default)
+
+    def __setitem__(self, session_id: str, session: SessionData):
+        self._sessions[session_id] = session
+        self._schedule(session_id, session.expiresAt)
+
+    def __delitem__(self, session_id: str):
+        del self._sessions[session_id]
+        del self._deadlines[session_id]
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def pop(self, session_id: str, default=None) -> SessionData | None:
+        self._deadlines.pop(session_id, None)
+        return self._sessions.pop(session_id, default)
+
+    def set_expiry(self, session_id: str, expires_at: datetime):
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.expiresAt = expires_at
+            self._schedule(session_id, expires_at)
+
+    def remove_expired(self) -> int:
+        now = time.monotonic()
+        removed = 0
+        while self._heap and self._heap[0][0] <= now:
+            deadline, session_id = heapq.heappop(self._heap)
+            if self._deadlines.get(session_id) == deadline:
+                del self._deadlines[session_id]
+                del self._sessions[session_id]
+                removed += 1
+
+        return removed
+
+    def next_expiry(self) -> float | None:
+        while self._heap:
+            deadline, session_id = self._heap[0]
+            if self._deadlines.get(session_id) == deadline:
+                return max(deadline - time.monotonic(), 0.0)
+            heapq.heappop(self._heap)
+
+        return None
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions in a SQLite database in WAL mode, shared by every process on
+    the host that opens the same file.
+    """
+
+    def __init__(self, path: str):
+        self.db = SQLiteDatabase(
+            path,
+            """CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                register_no TEXT NOT NULL,
+                cookie TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )""",
+            "CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)",
+        )
+
+    def get(self, session_id: str, default=None) -> SessionData | None:
+        row = self.db.conn.execute(
+            "SELECT register_no, cookie, created_at, expires_at FROM sessions WHERE session_id = ?",
+            (session_id,),
+        ).fetchone()
+        return default if row is None else self._to_session(session_id, row)
+
+    @staticmethod
+    def _to_session(session_id: str, row: tuple) -> SessionData:
+        register_no, cookie, created_at, expires_at = row
+        return SessionData(
+            roll_no=register_no,
+            session_id=session_id,
+            cookie=cookie,
+            createdAt=datetime.fromtimestamp(created_at),
+            expiresAt=datetime.fromtimestamp(expires_at),
+        )
+
+    def __setitem__(self, session_id: str, session: SessionData):
+        self.db.conn.execute(
+            "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?)",
+            (
+                session_id,
+                session.register_no,
+                session.cookie,
+                session.createdAt.timestamp(),
+                session.expiresAt.timestamp(),
+            ),
+        )
+
+    def __delitem__(self, session_id: str):
+        cursor = self.db.conn.execute(
+            "DELETE FROM sessions WHERE session_id = ?", (session_id,)
+        )
+        if cursor.rowcount == 0:
+            raise KeyError(session_id)
+
+    def __contains__(self, session_id: str) -> bool:
+        return (
+            self.db.conn.execute(
+                "SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            is not None
+        )
+
+    def __len__(self) -> int:
+        return self.db.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def pop(self, session_id: str, default=None) -> SessionData | None:
+        rows = self.db.conn.execute(
+            "DELETE FROM sessions WHERE session_id = ? RETURNING register_no, cookie, created_at, expires_at",
+            (session_id,),
+        ).fetchall()
+        return self._to_session(session_id, rows[0]) if rows else default
+
+    def set_expiry(self, session_id: str, expires_at: datetime):
+        self.db.conn.execute(
+            "UPDATE sessions SET expires_at = ? WHERE session_id = ?",
+            (expires_at.timestamp(), session_id),
+        )
+
+    def remove_expired(self) -> int:
+        # the expires_at index keeps this proportional to the expired rows
+        return self.db.conn.execute(
+            "DELETE FROM sessions WHERE expires_at < ?", (time.time(),)
+        ).rowcount
+
+    def next_expiry(self) -> float | None:
+        earliest = self.db.conn.execute(
+            "SELECT MIN(expires_at) FROM sessions"
+        ).fetchone()[0]
+        return None if earliest is None else max(earliest - time.time(), 0.0)
+
+
+def create_session_store() -> SessionStore:
+    if REZConfig.REZ_SESSION_STORE == "sqlite":
+        if REZConfig.REZ_SESSION_MODE == "server":
+            # MCP sessions only live in the process that opened them
+            logger.warning(
+                "REZ_SESSION_STORE=sqlite with REZ_SESSION_MODE=server neither "
+                "allows several workers nor lets clients resume their sessions "
+                "after a restart, use REZ_SESSION_MODE=sealed for that"
+            )
+        return SQLiteSessionStore(REZConfig.REZ_SESSION_DB)
+    if REZConfig.REZ_SESSION_STORE != "memory":
+        raise Exception(f"Unknown REZ_SESSION_STORE '{REZConfig.REZ_SESSION_STORE}'")
+    return InMemorySessionStore()
+
+
+sessions: SessionStore = create_session_store()
+
+
+class TokenBlacklist:
+    """
+    Login tokens that were already used, kept until they expire.
+
+    Tokens are stored as 16 byte BLAKE2b digests, bucketed by the expiry
+    second carried in the token. A token is dropped as soon as
+    `verify_token` would reject it as expired anyway, so it can never be
+    replayed and memory only holds the tokens still valid.
+
+    Any other string can be kept the same way by passing its `expiry`.
+    """
+
+    def __init__(self):
+        self._digests: set[bytes] = set()
+        self._buckets: dict[int, list[bytes]] = {}
+        self._expiries: list[int] = []  # min-heap of the bucket keys
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def add(self, token: str, expiry: int | None = None) -> bool:
+        """Returns whether the token was added, False if it already was in."""
+        expiry = token_expiry(token) if expiry is None else expiry
+        if expiry is None or int(time.time()) > expiry:
+            return False  # verify_token rejects it already
+
+        digest = self._digest(token)
+        if digest in self._digests:
+            return False
+
+        self._digests.add(digest)
+        bucket = self._buckets.get(expiry)
+        if bucket is None:
+            self._buckets[expiry] = bucket = []
+            heapq.heappush(self._expiries, expiry)
+        bucket.append(digest)
+        return True
+
+    def discard(self, token: str):
+        # the digest stays in its bucket, `remove_expired` drops it harmlessly
+        self._digests.discard(self._digest(token))
+
+    def __contains__(self, token: str) -> bool:
+        return self._digest(token) in self._digests
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+    def remove_expired(self) -> int:
+        now = int(time.time())
+        removed = 0
+        # verify_token fails once now > expiry
+        while self._expiries and self._expiries[0] < now:
+            for digest in self._buckets.pop(heapq.heappop(self._expiries)):
+                self._digests.discard(digest)
+                removed += 1
+
+        return removed
+
+    def next_expiry(self) -> float | None:
+        """Seconds until the earliest blacklisted token can be dropped."""
+        if not self._expiries:
+            return None
+        return max(self._expiries[0] + 1 - time.time(), 0.0)
+
+
+class SQLiteTokenBlacklist(TokenBlacklist):
+    """
+    A `TokenBlacklist` in a table of the SQLite session database, so a token
+    used or a session revoked on one worker is refused by all of them.
+    """
+
+    def __init__(self, path: str, table: str):
+        self.table = table
+        self.db = SQLiteDatabase(
+            path,
+            f"""CREATE TABLE IF NOT EXISTS {table} (
+                digest BLOB PRIMARY KEY,
+                expiry INTEGER NOT NULL
+            )""",
+            f"CREATE INDEX IF NOT EXISTS {table}_expiry ON {table} (expiry)",
+        )
+
+    def add(self, token: str, expiry: int | None = None) -> bool:
+        expiry = token_expiry(token) if expiry is None else expiry
+        if expiry is None or int(time.time()) > expiry:
+            return False
+
+        return (
+            self.db.conn.execute(
+                f"INSERT OR IGNORE INTO {self.table} VALUES (?, ?)",
+                (self._digest(token), expiry),
+            ).rowcount
+            == 1
+        )
+
+    def discard(self, token: str):
+        self.db.conn.execute(
+            f"DELETE FROM {self.table} WHERE digest = ?", (self._digest(token),)
+        )
+
+    def __contains__(self, token: str) -> bool:
+        return (
+            self.db.conn.execute(
+                f"SELECT 1 FROM {self.table} WHERE digest = ?", (self._digest(token),)
+            ).fetchone()
+            is not None
+        )
+
+    def __len__(self) -> int:
+        return self.db.conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def remove_expired(self) -> int:
+        return self.db.conn.execute(
+            f"DELETE FROM {self.table} WHERE expiry < ?", (int(time.time()),)
+        ).rowcount
+
+    def next_expiry(self) -> float | None:
+        earliest = self.db.conn.execute(
+            f"SELECT MIN(expiry) FROM {self.table}"
+        ).fetchone()[0]
+        return None if earliest is None else max(earliest + 1 - time.time(), 0.0)
+
+
+def create_token_blacklist(table: str) -> TokenBlacklist:
+    """Shares the blacklist between workers whenever the sessions are shared."""
+    if REZConfig.REZ_SESSION_STORE == "sqlite":
+        return SQLiteTokenBlacklist(REZConfig.REZ_SESSION_DB, table)
+    return TokenBlacklist()
+
+
+blacklist_tokens = create_token_blacklist("blacklist_tokens")
+
+
+# Sealed sessions (REZ_SESSION_MODE=sealed): the client holds the session as
+# an encrypted token and sends it as `Authorization: Bearer <token>`, so the
+# server keeps nothing per session but the ids of the ones logged out.
+if REZConfig.REZ_SESSION_MODE not in ("server", "sealed"):
+    raise Exception(f"Unknown REZ_SESSION_MODE '{REZConfig.REZ_SESSION_MODE}'")
+
+SEALED = REZConfig.REZ_SESSION_MODE == "sealed"
+
+revoked_sessions = create_token_blacklist("revoked_sessions")
+
+
+def seal_session(
+    session: SessionData, exam_code: str | None = None, expiry_in: int | None = None
+) -> str:
+    """
+    Packs a session into a sealed token that ends with the session.
+
+    With `exam_code` the token is a download link for that exam instead,
+    which `open_sealed_session` won't accept as a login.
+    """
+    payload = {
+        "s": session.session_id,
+        "r": session.register_no,
+        "c": session.cookie,
+        "t": int(session.createdAt.timestamp()),
+    }
+    if exam_code is not None:
+        payload["x"] = exam_code
+
+    remaining = int((session.expiresAt - datetime.now()).total_seconds())
+    return seal(
+        json.dumps(payload, separators=(",", ":")),
+        remaining if expiry_in is None else min(expiry_in, remaining),
+    )
+
+
+def unseal_session(token: str) -> tuple[SessionData, str | None] | None:
+    """
+    Opens a token of `seal_session` into its session and exam code.
+
+    Returns None when the token is invalid or expired. Whether the session
+    was logged out is left to the caller, see `revoked_sessions`.
+    """
+    data, valid = unseal(token)
+    if not valid:
+        return None
+
+    payload = json.loads(data)
+    session = SessionData(
+        roll_no=payload["r"],
+        session_id=payload["s"],
+        cookie=payload["c"],
+        createdAt=datetime.fromtimestamp(payload["t"]),
+        expiresAt=datetime.fromtimestamp(sealed_expiry(token)),
+    )
+    return session, payload.get("x")
+
+
+def bearer_token() -> str | None:
+    """The bearer token of the MCP request being handled, if any."""
+    scheme, _, token = get_http_headers().get("authorization", "").partition(" ")
+    return token.strip() if scheme.lower() == "bearer" and token else None
+
+
+def open_sealed_session(token: str | None) -> SessionData | None:
+    """Returns the session of a sealed login token, None if not logged in."""
+    unsealed = unseal_session(token) if token else None
+    if unsealed is None or unsealed[1] is not None:
+        return None
+
+    session = unsealed[0]
+    return None if session.session_id in revoked_sessions else session
 
 
-sessions: dict[str, SessionData] = {}
-blacklist_tokens: set[str] = set()
+def download_token(session: SessionData, exam_code: str) -> str:
+    """The token of a `/pdf/*` link to a PDF of `exam_code`, valid for 10 minutes."""
+    if SEALED:
+        return seal_session(session, exam_code, expiry_in=600)
+    return generate_token(f"{session.session_id}:{exam_code}")
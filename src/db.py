@@ -0,0 +1,42 @@
+import logging
+import os
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteDatabase:
+    """
+    A SQLite file in WAL mode, shared by every process on the host that
+    opens it.
+
+    sqlite connections must not cross a fork, so `conn` opens one in each
+    process on first use, and creates the tables of `schema` on it.
+    """
+
+    def __init__(self, path: str, *schema: str):
+        self.path = path
+        self.schema = schema
+        self._conn: sqlite3.Connection | None = None
+        self._pid: int | None = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(
+                self.path, isolation_level=None, check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            for statement in self.schema:
+                self._conn.execute(statement)
+            self._pid = os.getpid()
+            logger.info("Opened SQLite database at %s", self.path)
+
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
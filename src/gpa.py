@@ -0,0 +1,136 @@
+import hashlib
+import logging
+import re
+import zlib
+from io import BytesIO
+
+from cache import LRUMemo
+from parsing import run
+
+logger = logging.getLogger(__name__)
+
+GPA_PATTERN = re.compile(r"GPA for (.*?) Semester\s*:\s*(.*)")
+# Same as GPA_PATTERN, but the value may sit in the next text run.
+_RUNS_GPA_PATTERN = re.compile(r"GPA for (.*?) Semester\s*:\s*([^\n]*\S)")
+
+_STREAM = re.compile(rb"(?<!end)stream\r?\n")
+_LITERAL = rb"\((?:\\[\s\S]|[^\\()])*\)"
+_SHOW_TEXT = re.compile(
+    rb"(" + _LITERAL + rb")\s*(?:Tj|'|\")|\[((?:" + _LITERAL + rb"|[^\]])*)\]\s*TJ"
+)
+_LITERAL_IN_ARRAY = re.compile(_LITERAL)
+_ESCAPE = re.compile(rb"\\([0-7]{1,3}|\r\n|[\s\S])")
+_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f"}
+# Streams that never hold page text: images, fonts and ICC profiles.
+_SKIP_STREAM = re.compile(rb"/Subtype\s*/Image|/Length[123]\b|/N\s+[134]\b")
+
+_NOT_MEMOIZED = object()
+
+# GPAs keyed by the SHA-256 of their PDF
+gpa_memo = LRUMemo(maxsize=1024)
+
+
+def _unescape(match: re.Match) -> bytes:
+    escaped = match.group(1)
+    if escaped[:1].isdigit():
+        return bytes([int(escaped, 8) & 0xFF])
+    if escaped in (b"\n", b"\r", b"\r\n"):
+        return b""  # line continuation
+    return _ESCAPES.get(escaped, escaped)
+
+
+def _literal(raw: bytes) -> str:
+    return _ESCAPE.sub(_unescape, raw[1:-1]).decode("latin-1")
+
+
+def _content_streams(pdf: bytes):
+    """Yields the decoded content of each stream that may hold page text."""
+    for match in _STREAM.finditer(pdf):
+        header = pdf[pdf.rfind(b"obj", 0, match.start()) : match.start()]
+        end = pdf.find(b"endstream", match.end())
+        if end == -1 or _SKIP_STREAM.search(header):
+            continue
+
+        data = pdf[match.end() : end]
+        if b"/FlateDecode" in header:
+            try:
+                data = zlib.decompressobj().decompress(data)
+            except zlib.error:
+                continue
+        elif b"/Filter" in header:
+            continue
+
+        yield data
+
+
+def _scan_content_streams(pdf: bytes) -> str | None:
+    """
+    Finds the GPA in the text show operators of the raw content streams.
+
+    Only literal strings are read, which covers the CIT result PDFs. Hex
+    strings and fonts with custom encodings return None.
+    """
+    for content in _content_streams(pdf):
+        if b"GPA" not in content:
+            continue
+
+        runs = []
+        for match in _SHOW_TEXT.finditer(content):
+            if match.group(1) is not None:
+                runs.append(_literal(match.group(1)))
+            else:
+                runs.append(
+                    "".join(
+                        _literal(part)
+                        for part in _LITERAL_IN_ARRAY.findall(match.group(2))
+                    )
+                )
+
+        found = _RUNS_GPA_PATTERN.search("\n".join(runs))
+        if found:
+            return found.group(2).strip()
+
+    return None
+
+
+def _extract_with_pypdf(pdf: bytes) -> str | None:
+    from pypdf import PdfReader  # only needed for PDFs the scan above can't read
+
+    found = GPA_PATTERN.search(PdfReader(BytesIO(pdf)).get_page(0).extract_text())
+    return found.group(2) if found else None
+
+
+def _read_gpa(pdf: bytes) -> str | None:
+    gpa = _scan_content_streams(pdf)
+    if gpa is None:
+        logger.info("GPA not found in the content streams, using pypdf")
+        gpa = _extract_with_pypdf(pdf)
+    return gpa
+
+
+def extract_gpa(pdf: bytes) -> str | None:
+    """
+    Reads the "GPA for ... Semester : <gpa>" line of a result PDF.
+
+    Scans the content streams first and falls back to full pypdf text
+    extraction when that finds nothing. Results are memoized by the SHA-256
+    of the PDF.
+    """
+    digest = hashlib.sha256(pdf).digest()
+    gpa = gpa_memo.get(digest, _NOT_MEMOIZED)
+    if gpa is _NOT_MEMOIZED:
+        gpa = _read_gpa(pdf)
+        gpa_memo.set(digest, gpa)
+
+    return gpa
+
+
+async def read_gpa(pdf: bytes) -> str | None:
+    """`extract_gpa(pdf)` off the event loop, or its memoized result."""
+    digest = hashlib.sha256(pdf).digest()
+    gpa = gpa_memo.get(digest, _NOT_MEMOIZED)
+    if gpa is _NOT_MEMOIZED:
+        gpa = await run(_read_gpa, pdf)
+        gpa_memo.set(digest, gpa)
+
+    return gpa
@@ -0,0 +1,138 @@
+"""
+Logging that stays off the request path.
+
+Loggers only put records on a queue. A background thread formats them
+and writes them out, as text or as one JSON object per line. INFO and
+DEBUG records of the loggers in REZ_LOG_SAMPLE are sampled before they
+reach the queue. Warnings and errors are always kept.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from config import REZConfig
+
+TEXT_FORMAT = "%(levelname)s:%(name)s:%(message)s"
+
+_listener: QueueListener | None = None
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record, with the time, level, logger and message."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SampleFilter(logging.Filter):
+    """
+    Keeps a share of the INFO and DEBUG records of some loggers.
+
+    `rates` maps logger names to the share kept, and covers their child
+    loggers too, so `tools` samples `tools.results`.
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._cache: dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate, parent = 1.0, name
+            while parent:
+                if parent in self.rates:
+                    rate = self.rates[parent]
+                    break
+                parent = parent.rpartition(".")[0]
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Queues records as they are, leaving the `%` formatting to the writer.
+
+    The stock `prepare` formats the message in the logging thread, which
+    here is the event loop. Records stay in this process, so they don't
+    need to be made picklable either. Arguments are formatted when written,
+    so they must not be mutated after the call.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def parse_sample_rates(spec: str) -> dict[str, float]:
+    """Parses `"utils:0.1,tools:0.5"` into `{"utils": 0.1, "tools": 0.5}`."""
+    rates = {}
+    for item in spec.split(","):
+        if item.strip():
+            name, _, rate = item.partition(":")
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+def setup_logging(stream=None):
+    """
+    Sends every log record through the queue to `stream`, stderr by default.
+    Safe to call more than once.
+    """
+    global _listener
+
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    if REZConfig.REZ_LOG_FORMAT == "json":
+        output.setFormatter(JSONFormatter())
+    elif REZConfig.REZ_LOG_FORMAT == "text":
+        output.setFormatter(logging.Formatter(TEXT_FORMAT))
+    else:
+        raise Exception(f"Unknown REZ_LOG_FORMAT '{REZConfig.REZ_LOG_FORMAT}'")
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _DeferredQueueHandler(records)
+    rates = parse_sample_rates(REZConfig.REZ_LOG_SAMPLE)
+    if rates:
+        handler.addFilter(SampleFilter(rates))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(REZConfig.REZ_LOG_LEVEL.upper())
+
+    _listener = QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Writes out the queued records and stops the writer thread."""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,68 +1,124 @@
 from fastmcp import FastMCP
 from tools.setup import login, logout, get_profile
-from tools.results import get_results, get_result, download_result
+from tools.results import get_results, get_result, get_all_results, download_result
 from tools.hallticket import get_halltickets, download_hallticket
+from tools.bundle import download_bundle
 from config import REZConfig
 from manager import rez_app, rez_lifespan, sessions
+from data import SEALED, bearer_token, open_sealed_session
 from starlette.applications import Starlette
 from starlette.routing import Mount
 from contextlib import asynccontextmanager, AsyncExitStack
 import logging
 from fastmcp.server.middleware import Middleware, MiddlewareContext
 from datetime import datetime, timedelta
+import os
+import secrets
+import time
 import uvicorn
+from logs import setup_logging
+from admission import tool_admission
+from metrics import TOOL_ERRORS, TOOL_LATENCY
 
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger(__name__)
 
+TOOLS = (
+    login,
+    logout,
+    get_profile,
+    get_results,
+    get_result,
+    get_all_results,
+    download_result,
+    get_halltickets,
+    download_hallticket,
+    download_bundle,
+)
+TOOL_NAMES = frozenset(tool.__name__ for tool in TOOLS)
+
 
 class AuthMiddleware(Middleware):
     async def on_call_tool(self, mctx: MiddlewareContext, call_next):
-        if mctx.message.name != "login":
-            session_id = mctx.fastmcp_context.session_id
-            session = sessions.get(session_id)
-
+        tool = mctx.message.name
+        # the name comes from the client, so only known ones become labels
+        label = tool if tool in TOOL_NAMES else "unknown"
+        start = time.perf_counter()
+        try:
+            if tool != "login":
+                self.authorize(mctx)
+
+            limiter = tool_admission(tool)
+            if limiter is None:
+                return await call_next(mctx)
+
+            # a full queue fails the call at once, with when to try again
+            async with limiter.slot():
+                return await call_next(mctx)
+
+        except Exception:
+            TOOL_ERRORS.inc(1, label)
+            raise
+
+        finally:
+            TOOL_LATENCY.observe(time.perf_counter() - start, label)
+
+    @staticmethod
+    def authorize(mctx: MiddlewareContext):
+        if SEALED:
+            session = open_sealed_session(bearer_token())
             if session is None:
-                logger.info(f"User not logged in. Session ID: {session_id}")
+                logger.info("No valid sealed session in the request")
                 raise Exception("User not logged in, login to continue.")
 
-            now = datetime.now()
-            expires_at = session.expiresAt
-            if now > expires_at:
-                del sessions[session_id]  # remove if the session is expired.
-                logger.info(
-                    f"Removing Session({session_id}) expired at {expires_at.strftime('%Y-%m-%d %H:%M:%S')} | Register No: {session.register_no}"
-                )
-                raise Exception("Session expired, make a relogin request to continue.")
-            elif expires_at - now <= timedelta(minutes=5):
-                new_expiry = expires_at + timedelta(
-                    minutes=10
-                )  # if the session is gonna end in 5 minutes add +10 mins
-                logger.info(
-                    f"Extending Session({session_id} from {expires_at.strftime('%Y-%m-%d %H:%M:%S')} -> {new_expiry.strftime('%Y-%m-%d %H:%M:%S')})"
-                )
-                sessions[session_id].expiresAt = new_expiry
-
             mctx.fastmcp_context.set_state("session", session)
-
-        response = await call_next(mctx)
-        return response
-
-
-def main():
+            return
+
+        session_id = mctx.fastmcp_context.session_id
+        session = sessions.get(session_id)
+
+        if session is None:
+            logger.info("User not logged in. Session ID: %s", session_id)
+            raise Exception("User not logged in, login to continue.")
+
+        now = datetime.now()
+        expires_at = session.expiresAt
+        if now > expires_at:
+            sessions.pop(session_id, None)  # remove if the session is expired.
+            logger.info(
+                "Removing Session(%s) expired at %s | Register No: %s",
+                session_id,
+                expires_at.strftime("%Y-%m-%d %H:%M:%S"),
+                session.register_no,
+            )
+            raise Exception("Session expired, make a relogin request to continue.")
+        elif expires_at - now <= timedelta(minutes=5):
+            new_expiry = expires_at + timedelta(
+                minutes=10
+            )  # if the session is gonna end in 5 minutes add +10 mins
+            logger.info(
+                "Extending Session(%s from %s -> %s)",
+                session_id,
+                expires_at.strftime("%Y-%m-%d %H:%M:%S"),
+                new_expiry.strftime("%Y-%m-%d %H:%M:%S"),
+            )
+            sessions.set_expiry(session_id, new_expiry)
+            session.expiresAt = new_expiry
+
+        mctx.fastmcp_context.set_state("session", session)
+
+
+def create_app() -> Starlette:
     mcp = FastMCP(name="Rez MCP Server")
     mcp.add_middleware(AuthMiddleware())
 
-    mcp.tool(login)
-    mcp.tool(logout)
-    mcp.tool(get_profile)
-    mcp.tool(get_results)
-    mcp.tool(get_result)
-    mcp.tool(download_result)
-    mcp.tool(get_halltickets)
-    mcp.tool(download_hallticket)
+    for tool in TOOLS:
+        mcp.tool(tool)
 
-    rez_mcp = mcp.http_app(path="/mcp", transport="streamable-http")
+    # sealed sessions need nothing from the MCP session, so skip keeping one
+    rez_mcp = mcp.http_app(
+        path="/mcp", transport="streamable-http", stateless_http=SEALED
+    )
     rez_mcp_lifespan = rez_mcp.lifespan
 
     @asynccontextmanager
@@ -72,11 +128,47 @@ def main():
             await stack.enter_async_context(rez_lifespan(app))
             yield
 
-    app = Starlette(
+    return Starlette(
         routes=[Mount("/rez", app=rez_mcp), Mount("/", app=rez_app)], lifespan=lifespan
     )
 
-    uvicorn.run(app, host=REZConfig.REZ_HOST, port=REZConfig.REZ_PORT)
+
+def main():
+    workers = REZConfig.REZ_WORKERS
+    if workers == 1:
+        # log_config=None leaves uvicorn's loggers to the queue of setup_logging
+        uvicorn.run(
+            create_app(),
+            host=REZConfig.REZ_HOST,
+            port=REZConfig.REZ_PORT,
+            log_config=None,
+        )
+        return
+
+    # MCP sessions live in the worker that opened them, so only sealed
+    # sessions over stateless HTTP work whichever worker gets the request.
+    if not SEALED or REZConfig.REZ_SESSION_STORE != "sqlite":
+        raise Exception(
+            "REZ_WORKERS > 1 needs REZ_SESSION_MODE=sealed and REZ_SESSION_STORE=sqlite"
+        )
+
+    if not os.getenv("REZ_SECRET_KEY") and not os.getenv("REZ_SECRET_KEY_FILE"):
+        # the workers inherit the environment, so they all sign with this key
+        os.environ["REZ_SECRET_KEY"] = secrets.token_hex(32)
+        logger.warning(
+            "No REZ_SECRET_KEY or REZ_SECRET_KEY_FILE set, tokens won't survive a restart"
+        )
+
+    logger.info("Starting %s workers", workers)
+    uvicorn.run(
+        "main:create_app",
+        factory=True,
+        workers=workers,
+        host=REZConfig.REZ_HOST,
+        port=REZConfig.REZ_PORT,
+        log_config=None,
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+    )
 
 
 if __name__ == "__main__":
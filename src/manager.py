@@ -1,32 +1,138 @@
-from datetime import datetime, timedelta
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import (
+    HTMLResponse,
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
+from starlette.background import BackgroundTask
 from fastapi.exceptions import HTTPException
 import logging
 import httpx
 from config import REZConfig
 from pydantic import BaseModel, SecretStr
+import fcntl
+import math
+import os
 import re
-from utils import call
-from io import BytesIO
+import time
+from utils import get_client, close_client
 import asyncio
+import metrics
+from admission import AdmissionError, admission, upstream
+from metrics import PDF_BYTES_SERVED, UPSTREAM_ERRORS, UPSTREAM_LATENCY
 from contextlib import asynccontextmanager
+from policy import policy_for
 from signer import verify_token
-from data import sessions, blacklist_tokens
+from templating import get_templates, preload_templates
+from data import (
+    SEALED,
+    SessionData,
+    blacklist_tokens,
+    revoked_sessions,
+    seal_session,
+    sessions,
+    unseal_session,
+)
+from datetime import datetime, timedelta
+from gpa import gpa_memo
+from parsing import shutdown as shutdown_parsers
+from bundle import BUNDLE_KINDS, BUNDLE_PREFIX, zip_pdfs
+from pages import (
+    forget,
+    hallticket_page,
+    page_cache,
+    parse_memo,
+    pdf,
+    pdf_cache,
+    pdf_available,
+    prefetch,
+    result_page,
+    stream_pdf,
+    strainers,
+)
 
 logger = logging.getLogger(__name__)
 
-templates = Jinja2Templates(directory="src/templates")
-
-
-class SessionData:
-    def __init__(self, roll_no: str, session_id: str, cookie: str):
-        self.register_no: str = roll_no
-        self.session_id: str = session_id
-        self.cookie: str = cookie
-        self.createdAt: datetime = datetime.now()
-        self.expiresAt: datetime = datetime.now() + timedelta(minutes=15)
+metrics.Gauge("rez_active_sessions", "Logged in sessions.", lambda: len(sessions))
+metrics.Gauge(
+    "rez_blacklisted_tokens",
+    "Used login tokens kept until they expire.",
+    lambda: len(blacklist_tokens),
+)
+metrics.Gauge(
+    "rez_page_cache_entries", "Parsed CIT pages cached.", lambda: len(page_cache)
+)
+metrics.CounterFunc(
+    "rez_parse_memo_hits_total",
+    "CIT pages whose parse was reused because the HTML was the same.",
+    lambda: parse_memo.hits,
+)
+metrics.CounterFunc(
+    "rez_parse_memo_misses_total", "CIT pages parsed.", lambda: parse_memo.misses
+)
+metrics.CounterFunc(
+    "rez_gpa_memo_hits_total",
+    "GPAs reused because the result PDF was the same.",
+    lambda: gpa_memo.hits,
+)
+metrics.CounterFunc(
+    "rez_gpa_memo_misses_total",
+    "GPAs read from result PDFs.",
+    lambda: gpa_memo.misses,
+)
+metrics.Gauge("rez_pdf_cache_bytes", "Bytes of PDFs cached.", lambda: pdf_cache.size)
+metrics.Gauge(
+    "rez_pdf_cache_entries", "PDFs cached.", lambda: pdf_cache.stats()["entries"]
+)
+metrics.CounterFunc(
+    "rez_pdf_cache_hits_total", "PDF cache hits.", lambda: pdf_cache.hits
+)
+metrics.CounterFunc(
+    "rez_pdf_cache_misses_total", "PDF cache misses.", lambda: pdf_cache.misses
+)
+metrics.Gauge(
+    "rez_upstream_in_flight",
+    "Requests to CIT in flight.",
+    lambda: upstream.limiter.in_flight,
+)
+metrics.Gauge(
+    "rez_upstream_queued",
+    "Requests waiting for a slot to CIT.",
+    lambda: upstream.limiter.queued,
+)
+metrics.CounterFunc(
+    "rez_upstream_rejected_total",
+    "Requests refused because the CIT queue was full or timed out.",
+    lambda: upstream.limiter.rejected,
+)
+metrics.Gauge(
+    "rez_upstream_breaker_open",
+    "1 while the CIT circuit breaker is open or half open, else 0.",
+    lambda: int(upstream.breaker.state != upstream.breaker.CLOSED),
+)
+metrics.CounterFunc(
+    "rez_upstream_breaker_opened_total",
+    "Times the CIT circuit breaker opened.",
+    lambda: upstream.breaker.opened,
+)
+for name, limiter in admission.items():
+    metrics.Gauge(
+        f"rez_admission_{name}_in_flight",
+        f"Admitted {name} calls running.",
+        lambda limiter=limiter: limiter.in_flight,
+    )
+    metrics.Gauge(
+        f"rez_admission_{name}_queued",
+        f"{name.capitalize()} calls waiting to be admitted.",
+        lambda limiter=limiter: limiter.queued,
+    )
+    metrics.CounterFunc(
+        f"rez_admission_{name}_rejected_total",
+        f"{name.capitalize()} calls turned away because the queue was full or timed out.",
+        lambda limiter=limiter: limiter.rejected,
+    )
 
 
 class LoginCreds(BaseModel):
@@ -34,23 +140,52 @@ class LoginCreds(BaseModel):
     password: SecretStr
 
 
+_cleanup_lock = None
+
+
+def runs_cleanup() -> bool:
+    """
+    Whether this process reaps expired sessions and tokens.
+
+    SQLite stores are shared by every worker on the host, so only the worker
+    holding a lock on `<REZ_SESSION_DB>.lock` reaps them. The lock is freed
+    when that worker exits, and the next worker to ask takes over.
+    """
+    global _cleanup_lock
+
+    if REZConfig.REZ_SESSION_STORE != "sqlite" or _cleanup_lock is not None:
+        return True
+
+    lock = open(f"{REZConfig.REZ_SESSION_DB}.lock", "a")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock.close()
+        return False
+
+    _cleanup_lock = lock
+    logger.info("Worker %s reaps the expired sessions of this host", os.getpid())
+    return True
+
+
 async def session_cleanup():
     while True:
         try:
-            now = datetime.now()
-            logger.info(f"Running regular cleanup at {now}")
-            expired = [
-                sid for sid, data in sessions.items() if data and now > data.expiresAt
-            ]
+            if not runs_cleanup():
+                await asyncio.sleep(REZConfig.REZ_SESSION_REAP_INTERVAL)
+                continue
+
+            expired = sessions.remove_expired()
 
             if expired:
-                for sid in expired:
-                    del sessions[sid]
-                logger.info(f"Cleaned up {len(expired)} sessions.")
-            else:
-                logger.info("No expired sessions to be cleaned up.")
+                logger.info("Cleaned up %s sessions.", expired)
 
-            await asyncio.sleep(600)  # sleep for 10 minutes
+            # wake up right when the next session expires
+            next_expiry = sessions.next_expiry()
+            interval = REZConfig.REZ_SESSION_REAP_INTERVAL
+            await asyncio.sleep(
+                interval if next_expiry is None else min(next_expiry + 0.01, interval)
+            )
 
         except asyncio.CancelledError:
             break
@@ -59,32 +194,134 @@ async def session_cleanup():
 async def remove_blacklist_tokens():
     while True:
         try:
-            blacklist_len = len(blacklist_tokens)
-
-            if blacklist_len == 0:
-                logger.info("No blacklisted tokens to clean up.")
-            else:
-                logger.info(f"Cleaning {blacklist_len} blacklisted tokens")
-                blacklist_tokens.clear()
-
-            await asyncio.sleep(600)  # sleep for 10 minutes
+            if not runs_cleanup():
+                await asyncio.sleep(REZConfig.REZ_SESSION_REAP_INTERVAL)
+                continue
+
+            removed = blacklist_tokens.remove_expired()
+            removed += revoked_sessions.remove_expired()
+
+            if removed:
+                logger.info("Dropped %s expired blacklisted tokens", removed)
+
+            interval = REZConfig.REZ_SESSION_REAP_INTERVAL
+            await asyncio.sleep(
+                min(
+                    [interval]
+                    + [
+                        expiry
+                        for expiry in (
+                            blacklist_tokens.next_expiry(),
+                            revoked_sessions.next_expiry(),
+                        )
+                        if expiry is not None
+                    ]
+                )
+            )
 
         except asyncio.CancelledError:
             break
 
 
+def load_deferred():
+    """Loads the templates and bs4, which startup skips, before a request needs them."""
+    preload_templates()
+    strainers()
+
+
 @asynccontextmanager
 async def rez_lifespan(app):
+    get_client()  # warm up the shared upstream client before the first request
+    deferred_task = asyncio.create_task(asyncio.to_thread(load_deferred))
     blacklist_cleanup_task = asyncio.create_task(remove_blacklist_tokens())
     session_cleanup_task = asyncio.create_task(session_cleanup())
 
     yield
 
+    deferred_task.cancel()
     blacklist_cleanup_task.cancel()
     session_cleanup_task.cancel()
+    await close_client()
+    shutdown_parsers()
+
+
+def _unavailable(request: Request, title: str, e: AdmissionError) -> HTMLResponse:
+    return get_templates().TemplateResponse(
+        request=request,
+        name="error.html",
+        context={
+            "status_code": "503",
+            "error_title": title,
+            "error_message": str(e),
+        },
+        status_code=503,
+        headers={"Retry-After": str(math.ceil(e.retry_after))},
+    )
+
+
+def _link_error(request: Request, valid: bool) -> HTMLResponse:
+    """The error page of a `/pdf/*` link that is invalid or whose session is gone."""
+    if not valid:
+        return get_templates().TemplateResponse(
+            request=request,
+            name="error.html",
+            context={
+                "status_code": "410",
+                "error_title": "Oh ohhhhh!",
+                "error_message": "The link is invalid or its expired, Please request a new one.",
+            },
+        )
+
+    logger.info("No session found for the link. May be the user logged out.")
+    return get_templates().TemplateResponse(
+        request=request,
+        name="error.html",
+        context={
+            "status_code": "401",
+            "error_title": "Are you logged in ?",
+            "error_message": "Oops! Your session decided to take a catnap. Time to log back in and wake it up!",
+        },
+    )
+
+
+class DownloadAdmission:
+    """
+    Admits `/pdf/*` requests through the `download` limiter.
+
+    The slot is held until the whole body is sent, streamed PDFs and ZIPs
+    included, and a request that can't get one is answered with a 503.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/pdf/"):
+            await self.app(scope, receive, send)
+            return
+
+        limiter = admission["download"]
+        try:
+            await limiter.acquire()
+        except AdmissionError as e:
+            logger.warning("Turned away %s: %s", scope["path"], e)
+            response = _unavailable(Request(scope), "Too many downloads", e)
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
 
 
 rez_app = FastAPI()
+rez_app.add_middleware(DownloadAdmission)
+
+
+@rez_app.exception_handler(AdmissionError)
+async def upstream_unavailable(request: Request, e: AdmissionError) -> HTMLResponse:
+    return _unavailable(request, "CIT is busy", e)
 
 
 @rez_app.get("/")
@@ -92,10 +329,28 @@ async def root() -> str:
     return "Rez MCP Server"
 
 
+@rez_app.get("/stats")
+async def stats() -> dict:
+    return {
+        "pdf_cache": pdf_cache.stats(),
+        "parse_memo": parse_memo.stats(),
+        "gpa_memo": gpa_memo.stats(),
+        "upstream": upstream.stats(),
+        "admission": {name: limiter.stats() for name, limiter in admission.items()},
+    }
+
+
+@rez_app.get("/metrics")
+async def prometheus_metrics() -> PlainTextResponse:
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @rez_app.get("/auth/login")
 async def login_page(request: Request, token: str) -> HTMLResponse:
     if token in blacklist_tokens or not verify_token(token)[1]:
-        return templates.TemplateResponse(
+        return get_templates().TemplateResponse(
             request=request,
             name="error.html",
             context={
@@ -105,203 +360,345 @@ async def login_page(request: Request, token: str) -> HTMLResponse:
             },
         )
 
-    return templates.TemplateResponse(
+    return get_templates().TemplateResponse(
         request=request, name="login.html", context={"token": token}
     )
 
 
 @rez_app.post("/auth/login")
 async def authorize(request: Request, token: str, creds: LoginCreds) -> JSONResponse:
-    if token in blacklist_tokens:
-        raise HTTPException(detail="Token is no longer valid", status_code=401)
-
     data, valid = verify_token(token)
     if not valid:
         raise HTTPException(detail=data, status_code=401)
 
+    # Claimed before CIT is asked, so concurrent logins with one token can't
+    # all get through. A failed login hands it back to be tried again.
+    if not blacklist_tokens.add(token):
+        raise HTTPException(detail="Token is no longer valid", status_code=401)
+
     session_id = data
+    logged_in = False
 
-    with httpx.Client(
-        base_url=REZConfig.CIT_BASE_URL,
-        timeout=15.0,
-        follow_redirects=False,
-        verify=False,
-    ) as client:
-        try:
-            response = client.post(
+    client = get_client()
+    try:
+        async with upstream.request():
+            start = time.perf_counter()
+            response = await client.post(
                 "/login.php?action=process",
                 data={
                     "user_name": creds.username,
                     "pass_word": creds.password.get_secret_value(),
                 },
-                headers={
-                    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:137.0) Gecko/20100101 Firefox/137.0",
-                    "Content-Type": "application/x-www-form-urlencoded",
-                },
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+                timeout=policy_for("/login.php").timeout(),
             )
-
-            # A successful login will result in a 302 redirect.
-            # If we get a 200 OK, it means the login page was re-rendered,
-            # likely with an error message.
-            if response.status_code == 200:
-                logger.warning("Login failed, received 200 OK. Body")
-                if "student login" in response.text.lower():
-                    raise HTTPException(
-                        detail="Incorrect username or password", status_code=401
-                    )
-                else:
-                    raise HTTPException(
-                        detail="Login failed: Unexpected response from auth service.",
-                        status_code=500,
-                    )
-
-            if response.status_code != 302:
+            UPSTREAM_LATENCY.observe(time.perf_counter() - start, "/login.php")
+            if response.is_server_error:
                 response.raise_for_status()
 
-            logger.info(f"Login successful with redirect. Headers: {response.headers}")
-            blacklist_tokens.add(token)
-
-            set_cookie_header = response.headers.get("set-cookie")
-            if not set_cookie_header:
-                logger.error("No set-cookie header found in the response.")
+        # A successful login will result in a 302 redirect.
+        # If we get a 200 OK, it means the login page was re-rendered,
+        # likely with an error message.
+        if response.status_code == 200:
+            logger.warning("Login failed, received 200 OK. Body")
+            if "student login" in response.text.lower():
                 raise HTTPException(
-                    detail="Login failed: no session cookie received.", status_code=500
+                    detail="Incorrect username or password", status_code=401
                 )
-
-            cookie_match = re.match(r"([^;]+)", set_cookie_header)
-            if not cookie_match:
-                logger.error(f"Could not parse cookie from header: {set_cookie_header}")
+            else:
                 raise HTTPException(
-                    detail="Login failed: could not parse session cookie.",
+                    detail="Login failed: Unexpected response from auth service.",
                     status_code=500,
                 )
 
-            cookie = cookie_match.group(1).strip()
-
-            sessions[session_id] = SessionData(
-                roll_no=creds.username, session_id=session_id, cookie=cookie
-            )
+        if response.status_code != 302:
+            response.raise_for_status()
 
-            return JSONResponse(content={"message": "Login Ok!"}, status_code=200)
+        logger.info("Login successful with redirect")
 
-        except HTTPException as e:
-            raise e
-        except httpx.HTTPStatusError as e:
-            status_code = e.response.status_code
-            content = e.response.text
-            logger.error(f"HTTP Status Error: ({status_code}) - {content}")
+        set_cookie_header = response.headers.get("set-cookie")
+        if not set_cookie_header:
+            logger.error("No set-cookie header found in the response.")
             raise HTTPException(
-                detail="Auth service returned an error", status_code=502
+                detail="Login failed: no session cookie received.", status_code=500
             )
-        except httpx.RequestError as e:
-            logger.error(f"HTTP Request Error: {str(e)}")
-            raise HTTPException(
-                detail="Couldn't reach the authentication service", status_code=503
-            )
-        except Exception as e:
-            logger.error(f"An unexpected error occurred during authorization: {str(e)}")
+
+        cookie_match = re.match(r"([^;]+)", set_cookie_header)
+        if not cookie_match:
+            logger.error("Could not parse cookie from header: %s", set_cookie_header)
             raise HTTPException(
-                detail="An unexpected internal error occurred.", status_code=500
+                detail="Login failed: could not parse session cookie.",
+                status_code=500,
             )
 
+        cookie = cookie_match.group(1).strip()
 
-@rez_app.get("/pdf/result")
-async def generate_result(request: Request, token: str) -> StreamingResponse:
-    data, valid = verify_token(token)
+        forget(session_id)  # never serve pages cached for a previous login
+        if SEALED:
+            session = SessionData(
+                roll_no=creds.username,
+                session_id=session_id,
+                cookie=cookie,
+                expiresAt=datetime.now()
+                + timedelta(seconds=REZConfig.REZ_SEALED_SESSION_TTL),
+            )
+            content = {"message": "Login Ok!", "session_token": seal_session(session)}
+        else:
+            session = SessionData(
+                roll_no=creds.username, session_id=session_id, cookie=cookie
+            )
+            sessions[session_id] = session
+            content = {"message": "Login Ok!"}
+
+        if REZConfig.REZ_PREFETCH:
+            prefetch(session)
+
+        logged_in = True
+        return JSONResponse(content=content, status_code=200)
+
+    except HTTPException as e:
+        raise e
+    except AdmissionError as e:
+        logger.warning("Login not sent to CIT: %s", e)
+        raise HTTPException(
+            detail=str(e),
+            status_code=503,
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+    except httpx.HTTPStatusError as e:
+        UPSTREAM_ERRORS.inc(1, "/login.php")
+        status_code = e.response.status_code
+        content = e.response.text
+        logger.error("HTTP Status Error: (%s) - %s", status_code, content)
+        raise HTTPException(detail="Auth service returned an error", status_code=502)
+    except httpx.RequestError as e:
+        UPSTREAM_ERRORS.inc(1, "/login.php")
+        logger.error("HTTP Request Error: %s", e)
+        raise HTTPException(
+            detail="Couldn't reach the authentication service", status_code=503
+        )
+    except Exception as e:
+        logger.error("An unexpected error occurred during authorization: %s", e)
+        raise HTTPException(
+            detail="An unexpected internal error occurred.", status_code=500
+        )
 
-    if not valid:
-        return templates.TemplateResponse(
-            request=request,
-            name="error.html",
-            context={
-                "status_code": "410",
-                "error_title": "Oh ohhhhh!",
-                "error_message": "The link is invalid or its expired, Please request a new one.",
-            },
+    finally:
+        if not logged_in:
+            blacklist_tokens.discard(token)
+
+
+_BYTE_RANGE = re.compile(r"(\d*)-(\d*)", re.ASCII)
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Parses a single `bytes=` range into inclusive (start, end) offsets.
+
+    Returns None when the header should be ignored (other units, several
+    ranges or a malformed range) and raises ValueError when the range is well
+    formed but can't be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    match = _BYTE_RANGE.fullmatch(spec.strip())
+    if match is None or not any(match.groups()):
+        return None
+
+    first, last = match.groups()
+    if not first:  # suffix range, the last N bytes
+        length = int(last)
+        if length <= 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:  # invalid, not unsatisfiable
+        return None
+    if start >= size:
+        raise ValueError(header)
+
+    return start, min(end, size - 1)
+
+
+async def _count_bytes(chunks, kind: str):
+    async for chunk in chunks:
+        PDF_BYTES_SERVED.inc(len(chunk), kind)
+        yield chunk
+
+
+async def serve_pdf(
+    request: Request, session, kind: str, exam_code: str, filename: str
+) -> Response:
+    """
+    Sends a result or hallticket PDF, answering HEAD and single Range requests.
+
+    PDFs already in `pdf_cache` are sent from memory. Otherwise, with
+    REZ_PDF_STREAMING on, full GETs are passed through from CIT chunk by
+    chunk as they arrive, so nothing is buffered. HEAD and Range requests
+    always go through the cache since CIT doesn't serve partial content.
+    """
+    headers = {
+        "Content-Disposition": f"inline; filename={filename}",
+        "Accept-Ranges": "bytes",
+    }
+    range_header = request.headers.get("range")
+    cached = pdf_available(session, kind, exam_code)
+
+    if request.method == "HEAD":
+        # Viewers HEAD first to learn the size before asking for ranges, so
+        # load the PDF into the cache here and serve the ranges from there.
+        headers["Content-Length"] = str(len(await pdf(session, kind, exam_code)))
+        return Response(media_type="application/pdf", headers=headers)
+
+    if not cached and not range_header and REZConfig.REZ_PDF_STREAMING:
+        streamed = await stream_pdf(session, kind, exam_code)
+        if "content-length" in streamed.headers and not streamed.headers.get(
+            "content-encoding"
+        ):
+            headers["Content-Length"] = streamed.headers["content-length"]
+
+        # Starlette awaits each send before pulling the next chunk, so a slow
+        # client slows the upstream read down instead of piling up memory.
+        return StreamingResponse(
+            _count_bytes(streamed.aiter_bytes(), kind),
+            media_type="application/pdf",
+            headers=headers,
+            background=BackgroundTask(streamed.aclose),
         )
 
-    session_id, exam_code = data.split(":")
-    session = sessions.get(session_id)
+    content = await pdf(session, kind, exam_code)
 
-    if not session:
-        logger.info(
-            f"No session found with ID {session_id}. May be the user logged out."
-        )
-        return templates.TemplateResponse(
-            request=request,
-            name="error.html",
-            context={
-                "status_code": "401",
-                "error_title": "Are you logged in ?",
-                "error_message": "Oops! Your session decided to take a catnap. Time to log back in and wake it up!",
-            },
-        )
+    if range_header:
+        try:
+            byte_range = _parse_range(range_header, len(content))
+        except ValueError:
+            return Response(
+                status_code=416, headers={"Content-Range": f"bytes */{len(content)}"}
+            )
+
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(content)}"
+            PDF_BYTES_SERVED.inc(end + 1 - start, kind)
+            return Response(
+                content[start : end + 1],
+                status_code=206,
+                media_type="application/pdf",
+                headers=headers,
+            )
+
+    PDF_BYTES_SERVED.inc(len(content), kind)
+    return Response(content, media_type="application/pdf", headers=headers)
+
+
+def _link_session(
+    token: str, bundle: bool = False
+) -> tuple[SessionData | None, str | None, bool]:
+    """
+    Resolves a `/pdf/*` link token into (session, exam code, token is valid).
+
+    With `bundle`, the token must be a bundle link, and the kind of PDFs it
+    bundles is returned in place of the exam code. Bundle links are not
+    valid for single PDFs.
+    """
+    if SEALED:
+        unsealed = unseal_session(token)
+        if unsealed is None or unsealed[1] is None:
+            return None, None, False
+
+        session, exam_code = unsealed
+        if session.session_id in revoked_sessions:
+            session = None
+    else:
+        data, valid = verify_token(token)
+        if not valid:
+            return None, None, False
+
+        session_id, exam_code = data.split(":")
+        session = sessions.get(session_id)
+
+    if exam_code.startswith(BUNDLE_PREFIX) != bundle:
+        return None, None, False
+    if bundle:
+        exam_code = exam_code[len(BUNDLE_PREFIX) :]
+        if exam_code not in BUNDLE_KINDS:
+            return None, None, False
+
+    return session, exam_code, True
+
+
+@rez_app.api_route("/pdf/result", methods=["GET", "HEAD"])
+async def generate_result(request: Request, token: str) -> Response:
+    session, exam_code, valid = _link_session(token)
+    if not valid or not session:
+        return _link_error(request, valid)
 
     register_no = session.register_no.replace(" ", "")
-    cookie = session.cookie
-    result_pdf = await call(
-        "/exam/result.php",
-        {"exam_cd": exam_code},
-        addtional_headers={"Cookie": cookie},
-        return_bytes=True,
+    return await serve_pdf(
+        request,
+        session,
+        "result",
+        exam_code,
+        f"RESULT_{register_no}_{exam_code}.pdf",
     )
-    result_pdf = BytesIO(result_pdf)
 
-    return StreamingResponse(
-        result_pdf,
-        media_type="application/pdf",
-        headers={
-            "Content-Disposition": f"inline; filename=RESULT_{register_no}_{exam_code}.pdf"
-        },
-    )
 
+@rez_app.api_route("/pdf/hallticket", methods=["GET", "HEAD"])
+async def generate_hallticket(request: Request, token: str) -> Response:
+    session, exam_code, valid = _link_session(token)
+    if not valid or not session:
+        return _link_error(request, valid)
 
-@rez_app.get("/pdf/hallticket")
-async def generate_hallticket(request: Request, token: str) -> StreamingResponse:
-    data, valid = verify_token(token)
+    register_no = session.register_no.replace(" ", "")
+    return await serve_pdf(
+        request,
+        session,
+        "hallticket",
+        exam_code,
+        f"HT_{register_no}_{exam_code}.pdf",
+    )
 
-    if not valid:
-        return templates.TemplateResponse(
-            request=request,
-            name="error.html",
-            context={
-                "status_code": "410",
-                "error_title": "Oh ohhhhh!",
-                "error_message": "The link is invalid or its expired, Please request a new one.",
-            },
-        )
 
-    session_id, exam_code = data.split(":")
-    session = sessions.get(session_id)
+@rez_app.get("/pdf/bundle")
+async def generate_bundle(request: Request, token: str) -> Response:
+    session, kind, valid = _link_session(token, bundle=True)
+    if not valid or not session:
+        return _link_error(request, valid)
 
-    if not session:
-        logger.info(
-            f"No session found with ID {session_id}. May be the user logged out."
-        )
-        return templates.TemplateResponse(
+    register_no = session.register_no.replace(" ", "")
+    if kind == "result":
+        exam_codes = list((await result_page(session))["exam_codes"])
+        files = {code: f"RESULT_{register_no}_{code}.pdf" for code in exam_codes}
+        filename = f"RESULTS_{register_no}.zip"
+    else:
+        exam_codes = sorted(set(await hallticket_page(session)))
+        files = {code: f"HT_{register_no}_{code}.pdf" for code in exam_codes}
+        filename = f"HALLTICKETS_{register_no}.zip"
+
+    if not files:
+        return get_templates().TemplateResponse(
             request=request,
             name="error.html",
             context={
-                "status_code": "401",
-                "error_title": "Are you logged in ?",
-                "error_message": "Oops! Your session decided to take a catnap. Time to log back in and wake it up!",
+                "status_code": "404",
+                "error_title": "Nothing here yet",
+                "error_message": f"Currently no {kind}s are available.",
             },
+            status_code=404,
         )
 
-    register_no = session.register_no.replace(" ", "")
-    cookie = session.cookie
-    result_pdf = await call(
-        "/exam/rpt_exam_hallticket.php",
-        {"exam_cd": exam_code},
-        addtional_headers={"Cookie": cookie},
-        return_bytes=True,
+    logger.info(
+        "Streaming %s %s PDFs as a bundle | Session ID: %s",
+        len(files),
+        kind,
+        session.session_id,
     )
-    result_pdf = BytesIO(result_pdf)
-
     return StreamingResponse(
-        result_pdf,
-        media_type="application/pdf",
-        headers={
-            "Content-Disposition": f"inline; filename=HT_{register_no}_{exam_code}.pdf"
-        },
+        _count_bytes(zip_pdfs(session, kind, files), "bundle"),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
@@ -0,0 +1,172 @@
+import math
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable
+
+# Prometheus' default buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_registry: list["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_set(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(ABC):
+    """
+    A metric in the Prometheus text format.
+
+    Values live in plain dicts and lists that are only written from the
+    event loop, so recording takes no lock: a dict lookup and an addition.
+    """
+
+    type = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        _registry.append(self)
+
+    @abstractmethod
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return "\n".join(
+            [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+            + self.samples()
+        )
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, *labels):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_label_set(self.labels, labels)} {_number(value)}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets) + (math.inf,)
+        # per label set: [count per bucket..., sum]
+        self._values: dict[tuple, list[float]] = {}
+
+    def observe(self, value: float, *labels):
+        counts = self._values.get(labels)
+        if counts is None:
+            self._values[labels] = counts = [0] * len(self.buckets) + [0.0]
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def samples(self) -> list[str]:
+        lines = []
+        for labels, counts in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = _label_set(self.labels, labels, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            label_set = _label_set(self.labels, labels)
+            lines.append(f"{self.name}_sum{label_set} {_number(counts[-1])}")
+            lines.append(f"{self.name}_count{label_set} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """A value read by calling `read` at scrape time, so it costs nothing to keep."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        super().__init__(name, help)
+        self.read = read
+
+    def samples(self) -> list[str]:
+        return [f"{self.name} {_number(self.read())}"]
+
+
+class CounterFunc(Gauge):
+    """A counter kept elsewhere, such as cache hits, read at scrape time."""
+
+    type = "counter"
+
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+UPSTREAM_LATENCY = Histogram(
+    "rez_upstream_request_seconds",
+    "Time to get a response from CIT, by path.",
+    ("path",),
+)
+UPSTREAM_ERRORS = Counter(
+    "rez_upstream_errors_total",
+    "CIT requests that failed or returned an error status, by path.",
+    ("path",),
+)
+UPSTREAM_RETRIES = Counter(
+    "rez_upstream_retries_total",
+    "CIT GETs sent again after a transient failure, by path.",
+    ("path",),
+)
+UPSTREAM_HEDGES = Counter(
+    "rez_upstream_hedges_total",
+    "Slow CIT GETs sent a second time, by path and the one that answered (first, hedge).",
+    ("path", "winner"),
+)
+TOOL_LATENCY = Histogram(
+    "rez_tool_call_seconds", "Time taken by MCP tool calls, by tool.", ("tool",)
+)
+TOOL_ERRORS = Counter(
+    "rez_tool_errors_total", "MCP tool calls that raised, by tool.", ("tool",)
+)
+PDF_BYTES_SERVED = Counter(
+    "rez_pdf_bytes_served_total",
+    "PDF bytes sent by /pdf/*, by kind (result, hallticket, bundle).",
+    ("kind",),
+)
+PREFETCHES = Counter(
+    "rez_prefetch_pages_total",
+    "Pages prefetched after login, by outcome (done, failed, skipped).",
+    ("outcome",),
+)
+ARCHIVE_LOOKUPS = Counter(
+    "rez_result_archive_lookups_total",
+    "Result archive lookups, by outcome (hit, changed, miss).",
+    ("outcome",),
+)
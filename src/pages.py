@@ -0,0 +1,261 @@
+import hashlib
+import re
+from functools import cache
+
+from cache import ByteLRUCache, LRUMemo, TTLCache
+from config import REZConfig
+from metrics import PREFETCHES
+from parsing import any_of, run, soup
+from utils import call, stream
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+RESULT_PAGE = "/exam/exam_result.php"
+HALLTICKET_PAGE = "/exam/param_exam_hallticket.php"
+PROFILE_PAGE = "/personal.php"
+
+PDF_PATHS = {
+    "result": "/exam/result.php",
+    "hallticket": "/exam/rpt_exam_hallticket.php",
+}
+
+# Parsed pages keyed by (session_id, path). Cached values are shared between
+# callers and must not be mutated.
+page_cache = TTLCache(
+    ttl=REZConfig.REZ_PAGE_CACHE_TTL, maxsize=REZConfig.REZ_PAGE_CACHE_SIZE
+)
+
+# Parsed pages keyed by (parser, hash of the HTML). Pages served to many
+# students or fetched again after `page_cache` expired come back the same,
+# so they aren't parsed twice. Same sharing rule as `page_cache`.
+parse_memo = LRUMemo(maxsize=REZConfig.REZ_PARSE_MEMO_SIZE)
+
+# PDFs keyed by (register number, exam code, document type), shared by all
+# sessions of a student and by the tools and the /pdf endpoints. They expire,
+# so a revaluated result is picked up even without the result archive.
+pdf_cache = ByteLRUCache(
+    max_bytes=REZConfig.REZ_PDF_CACHE_BYTES,
+    max_item_bytes=REZConfig.REZ_PDF_CACHE_MAX_ITEM_BYTES,
+    ttl=REZConfig.REZ_PDF_CACHE_TTL,
+)
+
+
+@cache
+def strainers() -> dict:
+    """
+    Only the parts of each page the parsers read are turned into a tree.
+
+    Built on first use, so bs4 is imported by the first parse and not at
+    startup.
+    """
+    from bs4 import SoupStrainer
+
+    return {
+        RESULT_PAGE: any_of(
+            SoupStrainer("option"), SoupStrainer("div", id=re.compile(r"^div_"))
+        ),
+        HALLTICKET_PAGE: SoupStrainer("input", id="exam_cd"),
+        # personal.php is laid out with tables all the way down, so a
+        # strainer on it would keep the whole page anyway.
+        PROFILE_PAGE: None,
+    }
+
+
+def parse_result_page(html: str) -> dict:
+    """
+    Parses `/exam/exam_result.php`.
+
+    Returns:
+        dict: `exam_codes` maps each exam code to its semester div id and
+        `tables` maps each div id to the rows of its result table.
+    """
+    sp = soup(html, strainers()[RESULT_PAGE])
+    exam_codes = {
+        option["value"].strip()[:-1]: option["value"].strip()[-1]
+        for option in sp.find_all("option")
+    }
+
+    tables = {}
+    for div_id in set(exam_codes.values()):
+        table = sp.find("div", id=f"div_{div_id}")
+        if table is None:
+            continue
+
+        tables[div_id] = [
+            [
+                td.get_text(strip=True).replace("$", "")
+                for td in row.find_all("td", class_="tablecol2")
+            ]
+            for row in table.find_all("tr", class_="row1")
+        ]
+
+    return {"exam_codes": exam_codes, "tables": tables}
+
+
+def parse_hallticket_page(html: str) -> list[str]:
+    """Parses `/exam/param_exam_hallticket.php` into the listed exam codes."""
+    sp = soup(html, strainers()[HALLTICKET_PAGE])
+
+    return [
+        exam_code
+        for tag in sp.find_all("input", {"id": "exam_cd"})
+        if (exam_code := tag.get("value", "").strip())
+    ]
+
+
+def parse_profile_page(html: str) -> dict:
+    """Parses `/personal.php` into a field -> value dict."""
+    sp = soup(html, strainers()[PROFILE_PAGE])
+    tables = sp.find("td", attrs={"align": "center"}).parent.find_all("table")
+    tables = list(
+        map(
+            lambda table: [
+                tr.td.string.strip() if tr.td.string else None
+                for tr in table.find_all("tr")
+            ],
+            tables,
+        )
+    )
+
+    return {k: v for k, v in zip(tables[0], tables[1])}
+
+
+async def parse(parser, html: str):
+    """`parser(html)` off the event loop, or its memoized result for the same HTML."""
+    key = (parser.__name__, hashlib.blake2b(html.encode(), digest_size=16).digest())
+    parsed = parse_memo.get(key)
+    if parsed is None:
+        parsed = await run(parser, html)
+        parse_memo.set(key, parsed)
+
+    return parsed
+
+
+async def _get_page(session, path: str, parser):
+    async def fetch():
+        html = await call(path, addtional_headers={"Cookie": session.cookie})
+        return await parse(parser, html)
+
+    return await page_cache.get_or_fetch((session.session_id, path), fetch)
+
+
+async def result_page(session) -> dict:
+    return await _get_page(session, RESULT_PAGE, parse_result_page)
+
+
+async def hallticket_page(session) -> list[str]:
+    return await _get_page(session, HALLTICKET_PAGE, parse_hallticket_page)
+
+
+async def profile_page(session) -> dict:
+    return await _get_page(session, PROFILE_PAGE, parse_profile_page)
+
+
+def _pdf_key(session, kind: str, exam_code: str) -> tuple[str, str, str]:
+    return session.register_no.replace(" ", ""), exam_code, kind
+
+
+async def pdf(session, kind: str, exam_code: str, store: bool = True) -> bytes:
+    """
+    Returns the `result` or `hallticket` PDF of `exam_code` for the session.
+
+    With `store` off a PDF that isn't cached or being fetched already is
+    fetched without keeping it in `pdf_cache`, for callers going through
+    many PDFs that would otherwise push everyone else's out.
+    """
+
+    async def fetch():
+        return await call(
+            PDF_PATHS[kind],
+            {"exam_cd": exam_code},
+            addtional_headers={"Cookie": session.cookie},
+            return_bytes=True,
+        )
+
+    if store or pdf_available(session, kind, exam_code):
+        return await pdf_cache.get_or_fetch(_pdf_key(session, kind, exam_code), fetch)
+
+    pdf_cache.misses += 1
+    return await fetch()
+
+
+def forget_pdf(session, kind: str, exam_code: str):
+    """Drops a cached PDF that CIT has replaced, such as after a revaluation."""
+    pdf_cache.remove(_pdf_key(session, kind, exam_code))
+
+
+def pdf_available(session, kind: str, exam_code: str) -> bool:
+    """Whether `pdf()` would be answered without a new upstream fetch."""
+    key = _pdf_key(session, kind, exam_code)
+    return key in pdf_cache or pdf_cache.is_fetching(key)
+
+
+async def stream_pdf(session, kind: str, exam_code: str):
+    """Opens a streamed upstream PDF response, bypassing `pdf_cache`."""
+    pdf_cache.misses += 1
+    return await stream(
+        PDF_PATHS[kind],
+        {"exam_cd": exam_code},
+        addtional_headers={"Cookie": session.cookie},
+    )
+
+
+_background: set[asyncio.Task] = set()
+
+
+def warm_pdf(session, kind: str, exam_code: str):
+    """Fetches a PDF into `pdf_cache` in the background, ahead of its download link."""
+
+    async def warm():
+        try:
+            await pdf(session, kind, exam_code)
+        except Exception as e:
+            logger.info("Failed to warm %s PDF %s: %s", kind, exam_code, e)
+
+    task = asyncio.create_task(warm())
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+_prefetch_budget = asyncio.Semaphore(REZConfig.REZ_PREFETCH_CONCURRENCY)
+
+
+def prefetch(session):
+    """
+    Loads the profile, result and hallticket pages of a new login into
+    `page_cache` in the background, so the first tool calls find them there.
+
+    At most REZ_PREFETCH_CONCURRENCY pages are prefetched at once across
+    all sessions. Pages that find the budget used up are skipped instead of
+    queued, so a login rush doesn't pile extra load on CIT.
+    """
+
+    async def load(name: str, page):
+        if _prefetch_budget.locked():
+            PREFETCHES.inc(1, "skipped")
+            return
+
+        async with _prefetch_budget:
+            try:
+                await page(session)
+                PREFETCHES.inc(1, "done")
+            except Exception as e:
+                PREFETCHES.inc(1, "failed")
+                logger.info("Failed to prefetch %s page: %s", name, e)
+
+    for name, page in (
+        ("profile", profile_page),
+        ("result", result_page),
+        ("hallticket", hallticket_page),
+    ):
+        task = asyncio.create_task(load(name, page))
+        _background.add(task)
+        task.add_done_callback(_background.discard)
+
+
+def forget(session_id: str):
+    """Drops every cached page of a session, e.g. on logout or re-login."""
+    page_cache.discard(lambda key: key[0] == session_id)
+    logger.info("Dropped cached pages | Session ID: %s", session_id)
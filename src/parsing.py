@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import cache
+from importlib.util import find_spec
+from typing import TYPE_CHECKING
+
+from config import REZConfig
+
+# bs4 is imported with the first parse rather than at startup
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup, ElementFilter, SoupStrainer
+
+logger = logging.getLogger(__name__)
+
+
+def _resolve_backend(name: str) -> str:
+    if name == "lxml" and find_spec("lxml") is None:
+        logger.warning(
+            "REZ_HTML_PARSER is lxml but lxml is not installed, install the lxml extra"
+        )
+        return "html.parser"
+    return name
+
+
+BACKEND = _resolve_backend(REZConfig.REZ_HTML_PARSER)
+
+_executor: Executor | None = None
+
+
+@cache
+def _any_of_type() -> type:
+    from bs4 import ElementFilter
+
+    class AnyOf(ElementFilter):
+        """Keeps the elements, and their subtrees, matched by any of the strainers."""
+
+        def __init__(self, *strainers: "SoupStrainer"):
+            super().__init__()
+            self.strainers = strainers
+
+        def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+            return any(
+                s.allow_tag_creation(nsprefix, name, attrs) for s in self.strainers
+            )
+
+        def allow_string_creation(self, string: str) -> bool:
+            return any(s.allow_string_creation(string) for s in self.strainers)
+
+    return AnyOf
+
+
+def any_of(*strainers: "SoupStrainer") -> "ElementFilter":
+    """A filter keeping the elements, and their subtrees, matched by any of the strainers."""
+    return _any_of_type()(*strainers)
+
+
+def soup(
+    html: str | bytes,
+    parse_only: "ElementFilter | None" = None,
+    backend: str | None = None,
+) -> "BeautifulSoup":
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(html, backend or BACKEND, parse_only=parse_only)
+
+
+def _get_executor() -> Executor | None:
+    global _executor
+
+    if _executor is None and REZConfig.REZ_PARSE_WORKERS > 0:
+        if REZConfig.REZ_PARSE_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=REZConfig.REZ_PARSE_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(
+                max_workers=REZConfig.REZ_PARSE_WORKERS, thread_name_prefix="rez-parse"
+            )
+        logger.info(
+            "Parsing with %s on %s %s workers",
+            BACKEND,
+            REZConfig.REZ_PARSE_WORKERS,
+            REZConfig.REZ_PARSE_EXECUTOR,
+        )
+
+    return _executor
+
+
+async def run(parser, *args):
+    """
+    Runs `parser(*args)` off the event loop.
+
+    With the process executor `parser` must be a module level function and
+    its arguments and result must be picklable.
+    """
+    executor = _get_executor()
+    if executor is None:
+        return parser(*args)
+
+    return await asyncio.get_running_loop().run_in_executor(executor, parser, *args)
+
+
+def shutdown():
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
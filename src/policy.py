@@ -0,0 +1,113 @@
+import random
+from collections import deque
+
+import httpx
+
+from config import REZConfig
+
+
+class RequestPolicy:
+    """
+    How a request to one CIT path is timed out, retried and hedged.
+
+    `connect` and `read` bound each attempt, `total` bounds all attempts,
+    backoffs and hedges together. Only idempotent GETs are ever retried or
+    hedged.
+    """
+
+    def __init__(
+        self,
+        connect: float = REZConfig.REZ_HTTP_CONNECT_TIMEOUT,
+        read: float = REZConfig.REZ_HTTP_READ_TIMEOUT,
+        total: float = REZConfig.REZ_HTTP_TOTAL_TIMEOUT,
+        retries: int = REZConfig.REZ_HTTP_RETRIES,
+        hedge: bool = REZConfig.REZ_HTTP_HEDGE,
+    ):
+        self.connect = connect
+        self.read = read
+        self.total = total
+        self.retries = retries
+        self.hedge = hedge
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=self.connect, read=self.read, write=self.read, pool=self.connect
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: a random wait up to base * 2^attempt, capped at 5s."""
+        return random.uniform(
+            0, min(REZConfig.REZ_HTTP_RETRY_BACKOFF * 2**attempt, 5.0)
+        )
+
+
+DEFAULT_POLICY = RequestPolicy()
+
+_PAGE_READ = min(10, REZConfig.REZ_HTTP_READ_TIMEOUT)
+_PAGE_TOTAL = min(20, REZConfig.REZ_HTTP_TOTAL_TIMEOUT)
+
+# The listing pages are a few KB of HTML that CIT answers quickly when it is
+# healthy, so a slow one is better cut short and asked again. PDFs take
+# longer to render and send. The login POST is never retried.
+POLICIES = {
+    "/exam/exam_result.php": RequestPolicy(read=_PAGE_READ, total=_PAGE_TOTAL),
+    "/exam/param_exam_hallticket.php": RequestPolicy(
+        read=_PAGE_READ, total=_PAGE_TOTAL
+    ),
+    "/personal.php": RequestPolicy(read=_PAGE_READ, total=_PAGE_TOTAL),
+    "/exam/result.php": RequestPolicy(),
+    "/exam/rpt_exam_hallticket.php": RequestPolicy(),
+    "/login.php": RequestPolicy(
+        read=min(15, REZConfig.REZ_HTTP_READ_TIMEOUT),
+        total=min(15, REZConfig.REZ_HTTP_TOTAL_TIMEOUT),
+        retries=0,
+        hedge=False,
+    ),
+}
+
+
+def policy_for(path: str) -> RequestPolicy:
+    return POLICIES.get(path, DEFAULT_POLICY)
+
+
+class LatencyTracker:
+    """
+    Recent CIT latencies per path, to know when a request is running late.
+
+    Hedges are capped at `hedge_ratio` of the requests sent, so a slow CIT
+    gets at most that much extra load from them.
+    """
+
+    def __init__(self, window: int = 256, min_samples: int = 20, hedge_ratio=0.1):
+        self.window = window
+        self.min_samples = min_samples
+        self.hedge_ratio = hedge_ratio
+        self.requests = 0
+        self.hedges = 0
+        self._samples: dict[str, deque[float]] = {}
+
+    def record(self, path: str, seconds: float):
+        samples = self._samples.get(path)
+        if samples is None:
+            self._samples[path] = samples = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def p95(self, path: str) -> float | None:
+        samples = self._samples.get(path)
+        if samples is None or len(samples) < self.min_samples:
+            return None
+        return sorted(samples)[int(len(samples) * 0.95)]
+
+    def hedge_delay(self, path: str) -> float | None:
+        """Seconds after which to send a hedge, None to not hedge this request."""
+        self.requests += 1
+        delay = self.p95(path)
+        if delay is None or self.hedges >= self.requests * self.hedge_ratio:
+            return None
+        return delay
+
+    def record_hedge(self):
+        self.hedges += 1
+
+
+latencies = LatencyTracker()
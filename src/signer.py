@@ -1,10 +1,12 @@
 import hmac
 from hashlib import sha256
 from config import REZConfig
+import os
 import time
 import base64
 import logging
 from datetime import datetime
+from functools import cache
 
 logger = logging.getLogger(__name__)
 
@@ -20,42 +22,117 @@ def base64_decode(s: str) -> bytes:
     return base64.urlsafe_b64decode(s)
 
 
+def _signing_key() -> tuple[str, bytes]:
+    return next(iter(REZConfig.SECRET_KEYS.items()))
+
+
 def generate_token(data: str, expiry_in: int = 600) -> str:
     expiry = int(time.time()) + expiry_in
 
     payload = f"{data}|{expiry}"
 
-    signature = hmac.new(REZConfig.SECRET_KEY, payload.encode(), sha256).digest()
+    kid, key = _signing_key()
+    signature = hmac.new(key, payload.encode(), sha256).digest()
 
-    return f"{base64_encode(payload.encode())}.{base64_encode(signature)}"
+    return f"{kid}.{base64_encode(payload.encode())}.{base64_encode(signature)}"
 
 
 def verify_token(token: str) -> tuple[str | None, bool]:
     try:
-        parts = token.split(".", 1)
+        parts = token.split(".")
+
+        if len(parts) != 3:
+            logger.info("Invalid token | %s", token)
+            return None, False
 
-        if len(parts) != 2:
-            logger.info(f"Invalid token | {token}")
+        key = REZConfig.SECRET_KEYS.get(parts[0])
+        if key is None:
+            logger.info("Token verification failed | %s | Unknown key id.", token)
             return None, False
 
-        payload, expected_sig = base64_decode(parts[0]), base64_decode(parts[1])
+        payload, expected_sig = base64_decode(parts[1]), base64_decode(parts[2])
 
-        computed_sig = hmac.new(REZConfig.SECRET_KEY, payload, sha256).digest()
+        computed_sig = hmac.new(key, payload, sha256).digest()
 
         if not hmac.compare_digest(computed_sig, expected_sig):
-            logger.info(f"Token verification failed | {token} |Signature mismatch.")
+            logger.info("Token verification failed | %s |Signature mismatch.", token)
             return None, False
 
         data, expiry = payload.decode().rsplit("|", 1)
 
         if int(time.time()) > int(expiry):
             logger.info(
-                f"Token expired | {token} | Expired at: {datetime.fromtimestamp(expiry)}"
+                "Token expired | %s | Expired at: %s",
+                token,
+                datetime.fromtimestamp(int(expiry)),
             )
             return None, False
 
         return data, True
 
     except Exception as e:
-        logger.error(f"Failed to verify the token: {str(e)}")
+        logger.error("Failed to verify the token: %s", e)
+        return None, False
+
+
+def token_expiry(token: str) -> int | None:
+    """Reads the expiry timestamp of a token without checking its signature."""
+    try:
+        payload = base64_decode(token.split(".")[1])
+        return int(payload.decode().rsplit("|", 1)[1])
+    except Exception:
+        return None
+
+
+@cache
+def _sealer(kid: str):
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+    # a key of its own, so a sealed token can never pass as a signed one
+    key = REZConfig.SECRET_KEYS[kid]
+    return AESGCM(hmac.new(key, b"rez-seal", sha256).digest())
+
+
+def seal(data: str, expiry_in: int) -> str:
+    """
+    Encrypts and authenticates `data` with AES-GCM into a url-safe token.
+
+    The expiry timestamp travels in the clear, authenticated as associated
+    data, so `sealed_expiry` can read it without the key.
+    """
+    kid, _ = _signing_key()
+    expiry = (int(time.time()) + expiry_in).to_bytes(8, "big")
+    nonce = os.urandom(12)
+    sealed = _sealer(kid).encrypt(nonce, data.encode(), expiry)
+
+    return f"{kid}.{base64_encode(expiry + nonce + sealed)}"
+
+
+def unseal(token: str) -> tuple[str | None, bool]:
+    """Opens a token made by `seal`, like `verify_token` does for signed ones."""
+    try:
+        kid, _, body = token.partition(".")
+        raw = base64_decode(body)
+        expiry, nonce, sealed = raw[:8], raw[8:20], raw[20:]
+        data = _sealer(kid).decrypt(nonce, sealed, expiry).decode()
+
+    except Exception as e:
+        logger.info("Failed to unseal the token: %s", type(e).__name__)
         return None, False
+
+    if int(time.time()) > int.from_bytes(expiry, "big"):
+        logger.info(
+            "Sealed token expired at %s",
+            datetime.fromtimestamp(int.from_bytes(expiry, "big")),
+        )
+        return None, False
+
+    return data, True
+
+
+def sealed_expiry(token: str) -> int | None:
+    """Reads the expiry timestamp of a sealed token without opening it."""
+    try:
+        return int.from_bytes(base64_decode(token.partition(".")[2])[:8], "big")
+    except Exception:
+        return None
@@ -0,0 +1,90 @@
+"""
+The HTML templates, compiled ahead of time.
+
+`python src/templating.py` compiles `src/templates` into Python modules
+under `src/templates/__compiled__`. The server loads those when they are
+newer than their sources and otherwise compiles the templates on first
+use as before. Jinja itself is only imported when a page is first rendered.
+"""
+
+import logging
+import os
+from functools import cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from fastapi.templating import Jinja2Templates
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+COMPILED_DIR = os.path.join(TEMPLATES_DIR, "__compiled__")
+
+
+def _sources() -> list[str]:
+    return sorted(name for name in os.listdir(TEMPLATES_DIR) if name.endswith(".html"))
+
+
+def _compiled_is_fresh() -> bool:
+    from jinja2 import ModuleLoader
+
+    for name in _sources():
+        compiled = os.path.join(COMPILED_DIR, ModuleLoader.get_module_filename(name))
+        try:
+            if os.path.getmtime(compiled) < os.path.getmtime(
+                os.path.join(TEMPLATES_DIR, name)
+            ):
+                return False
+        except FileNotFoundError:
+            return False
+
+    return True
+
+
+def _environment(loader):
+    from jinja2 import Environment
+
+    # what Jinja2Templates(directory=...) would have set up
+    return Environment(loader=loader, autoescape=True)
+
+
+@cache
+def get_templates() -> "Jinja2Templates":
+    from fastapi.templating import Jinja2Templates
+    from jinja2 import FileSystemLoader, ModuleLoader
+
+    if _compiled_is_fresh():
+        loader = ModuleLoader(COMPILED_DIR)
+    else:
+        logger.info(
+            "Templates are not precompiled or have changed, compiling them on "
+            "first use. Run `python src/templating.py` to precompile them."
+        )
+        loader = FileSystemLoader(TEMPLATES_DIR)
+
+    return Jinja2Templates(env=_environment(loader))
+
+
+def preload_templates():
+    """Sets up the templates and loads every one of them."""
+    env = get_templates().env
+    for name in _sources():
+        env.get_template(name)
+
+
+def compile_templates():
+    from jinja2 import FileSystemLoader
+
+    env = _environment(FileSystemLoader(TEMPLATES_DIR))
+    env.compile_templates(
+        COMPILED_DIR,
+        extensions=["html"],
+        zip=None,
+        ignore_errors=False,
+        log_function=logger.info,
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    compile_templates()
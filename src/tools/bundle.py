@@ -0,0 +1,55 @@
+from fastmcp import Context
+from pages import hallticket_page, result_page
+from pydantic import Field
+from typing import Literal
+from config import REZConfig
+from data import download_token
+from bundle import BUNDLE_PREFIX
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def download_bundle(
+    ctx: Context,
+    kind: Literal["result", "hallticket"] = Field(
+        ...,
+        description="`result` for every semester result, `hallticket` for every hallticket.",
+    ),
+) -> str:
+    """
+    Generates a ZIP of every result PDF or every hallticket PDF.
+
+    Use this instead of calling `download_result` or `download_hallticket` for each exam code.
+
+    Returns:
+        str: Downloadable ZIP link.(Valid only for 10 minutes)
+
+    Raises:
+        Exception: If the user is not logged in or if the API call fails.
+    """
+
+    session = ctx.get_state("session")
+    logger.info(
+        "`download_bundle` tool called with Session id %s | Register No: %s",
+        session.session_id,
+        session.register_no,
+    )
+
+    if kind == "result":
+        exam_codes = (await result_page(session))["exam_codes"]
+    else:
+        exam_codes = await hallticket_page(session)
+
+    if not exam_codes:
+        logger.info("No %ss are available | Session ID: %s", kind, session.session_id)
+        return f"Currently no {kind}s are available."
+
+    token = download_token(session, f"{BUNDLE_PREFIX}{kind}")
+    logger.info(
+        "Bundle download token generated | Session ID: %s | Register No: %s",
+        session.session_id,
+        session.register_no,
+    )
+
+    return f"[Click here to download all {kind}s]({REZConfig.REZ_BASE_URL}/pdf/bundle?token={token})"
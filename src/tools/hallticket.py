@@ -1,9 +1,8 @@
 from fastmcp import Context
-from utils import call
-from bs4 import BeautifulSoup
+from pages import hallticket_page, warm_pdf
 from pydantic import Field
 from config import REZConfig
-from signer import generate_token
+from data import download_token
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,25 +21,15 @@ async def get_halltickets(ctx: Context) -> list[str] | str:
 
     session = ctx.get_state("session")
     logger.info(
-        f"`get_halltickets` tool called with Session id {session.session_id} | Register No: {session.register_no}"
+        "`get_halltickets` tool called with Session id %s | Register No: %s",
+        session.session_id,
+        session.register_no,
     )
 
-    response = await call(
-        "/exam/param_exam_hallticket.php", addtional_headers={"Cookie": session.cookie}
-    )
-    sp = BeautifulSoup(response, "html.parser")
-
-    input_tags = sp.find_all("input", {"id": "exam_cd"})
-    exam_codes = list(
-        set(
-            exam_code
-            for tag in input_tags
-            if (exam_code := tag.get("value", "").strip())
-        )
-    )
+    exam_codes = list(set(await hallticket_page(session)))
 
     if not exam_codes:
-        logger.info(f"No halltickets are available | Session ID: {session.session_id}")
+        logger.info("No halltickets are available | Session ID: %s", session.session_id)
         return "Currently no halltickets are available."
 
     return exam_codes
@@ -64,26 +53,25 @@ async def download_hallticket(
 
     session = ctx.get_state("session")
     logger.info(
-        f"`download_hallticket` tool called with Session id {session.session_id} | Register No: {session.register_no}"
+        "`download_hallticket` tool called with Session id %s | Register No: %s",
+        session.session_id,
+        session.register_no,
     )
 
-    response = await call(
-        "/exam/param_exam_hallticket.php", addtional_headers={"Cookie": session.cookie}
-    )
-    sp = BeautifulSoup(response, "html.parser")
-
-    input_tags = sp.find_all("input", {"id": "exam_cd"})
-    exam_codes = [
-        exam_code for tag in input_tags if (exam_code := tag.get("value", "").strip())
-    ]
+    exam_codes = await hallticket_page(session)
 
     if not exam_codes:
-        logger.info(f"No halltickets are available | Session ID: {session.session_id}")
+        logger.info("No halltickets are available | Session ID: %s", session.session_id)
         return "Currently no halltickets are available."
 
-    token = generate_token(f"{session.session_id}:{exam_code}")
+    if exam_code in exam_codes:
+        warm_pdf(session, "hallticket", exam_code)
+
+    token = download_token(session, exam_code)
     logger.info(
-        f"Hallticket download token generated | Session ID: {session.session_id} | Register No: {session.register_no}"
+        "Hallticket download token generated | Session ID: %s | Register No: %s",
+        session.session_id,
+        session.register_no,
     )
 
     return f"[Click here to download hallticket]({REZConfig.REZ_BASE_URL}/pdf/hallticket?token={token})"
@@ -1,12 +1,11 @@
 from fastmcp import Context
+import asyncio
 import logging
-from utils import call
-from bs4 import BeautifulSoup
-from pypdf import PdfReader
-from io import BytesIO
-import re
+from pages import forget_pdf, pdf, result_page, warm_pdf
+from gpa import read_gpa
 from config import REZConfig
-from signer import generate_token
+from archive import results_archive
+from data import download_token
 
 logger = logging.getLogger(__name__)
 
@@ -23,16 +22,13 @@ async def get_results(ctx: Context) -> list | str:
     """
     session = ctx.get_state("session")
     logger.info(
-        f"`get_results` tool called with Session id {session.session_id} | Register No: {session.register_no}"
+        "`get_results` tool called with Session id %s | Register No: %s",
+        session.session_id,
+        session.register_no,
     )
 
-    data = await call(
-        "/exam/exam_result.php",
-        addtional_headers={"Cookie": session.cookie},
-    )
-    sp = BeautifulSoup(data, "html.parser")
-
-    exam_codes = [option["value"].strip()[:-1] for option in sp.find_all("option")]
+    page = await result_page(session)
+    exam_codes = list(page["exam_codes"])
 
     if not exam_codes:
         logger.info("No exam_codes found.")
@@ -57,18 +53,13 @@ async def get_result(ctx: Context, exam_code: str) -> dict | str:
 
     session = ctx.get_state("session")
     logger.info(
-        f"`get_result` tool called with Session id {session.session_id} | Register No: {session.register_no}"
+        "`get_result` tool called with Session id %s | Register No: %s",
+        session.session_id,
+        session.register_no,
     )
 
-    data = await call(
-        "/exam/exam_result.php",
-        addtional_headers={"Cookie": session.cookie},
-    )
-    sp = BeautifulSoup(data, "html.parser")
-    exam_codes = {
-        option["value"].strip()[:-1]: option["value"].strip()[-1]
-        for option in sp.find_all("option")
-    }
+    page = await result_page(session)
+    exam_codes = page["exam_codes"]
 
     if not exam_codes:
         logger.info("No exam_codes found.")
@@ -76,34 +67,33 @@ async def get_result(ctx: Context, exam_code: str) -> dict | str:
 
     if exam_code not in exam_codes.keys():
         logger.info(
-            f"Invalid exam code {exam_code} | Session ID {session.session_id} | Register No {session.register_no}"
+            "Invalid exam code %s | Session ID %s | Register No %s",
+            exam_code,
+            session.session_id,
+            session.register_no,
         )
         raise Exception(
             f"Invalid exam code {exam_code}. Available valid exam codes: {', '.join(exam_codes.keys())}"
         )
 
-    table = sp.find("div", id=f"div_{exam_codes[exam_code]}")
-
-    rows = table.find_all("tr", class_="row1")
-    data = [
-        [
-            td.get_text(strip=True).replace("$", "")
-            for td in row.find_all("td", class_="tablecol2")
-        ]
-        for row in rows
-    ]
-
-    pdf = await call(
-        "/exam/result.php",
-        {"exam_cd": exam_code},
-        addtional_headers={"Cookie": session.cookie},
-        return_bytes=True,
-    )
-    gpa = re.search(
-        r"GPA for (.*?) Semester\s*:\s*(.*)",
-        PdfReader(BytesIO(pdf)).get_page(0).extract_text(),
-    ).group(2)
+    data = page["tables"][exam_codes[exam_code]]
+    outcome, archived = results_archive.lookup(session.register_no, exam_code, data)
+    if archived is not None:
+        return archived
+    if outcome == "changed":
+        forget_pdf(session, "result", exam_code)  # the cached PDF is the old one
 
+    result_pdf = await pdf(session, "result", exam_code)
+    gpa = await read_gpa(result_pdf)
+    if gpa is None:
+        raise Exception(f"Couldn't read the GPA from the result of {exam_code}.")
+
+    result = _semester_result(data, gpa)
+    results_archive.put(session.register_no, exam_code, data, result)
+    return result
+
+
+def _semester_result(data: list[list[str]], gpa: str | None) -> dict:
     return {
         "semester": data[0][0],
         "papers": {sub[1]: sub[2:] for sub in data},
@@ -111,6 +101,99 @@ async def get_result(ctx: Context, exam_code: str) -> dict | str:
     }
 
 
+async def get_all_results(ctx: Context) -> dict | str:
+    """
+    Retrieves the results of every semester at once, with the mean of their GPAs.
+
+    Use this instead of calling `get_result` for each exam code.
+
+    Command:
+        Show each semester's results in a markdown table format, then the mean GPA with the note.
+        Don't call the mean GPA a CGPA.
+
+    Returns:
+        dict: `results` maps each exam code to its semester, papers(Name, Grade, Pass/Fail) and GPA,
+        `mean_gpa` is the unweighted mean of the GPAs of every exam code, arrear and supplementary
+        ones included, and `note` says so.
+
+    Raises:
+        Exception: If the user is not logged in or if the API call fails.
+    """
+    session = ctx.get_state("session")
+    logger.info(
+        "`get_all_results` tool called with Session id %s | Register No: %s",
+        session.session_id,
+        session.register_no,
+    )
+
+    page = await result_page(session)
+    exam_codes = page["exam_codes"]
+
+    if not exam_codes:
+        logger.info("No exam_codes found.")
+        return "Currently no results are available."
+
+    fanout = asyncio.Semaphore(REZConfig.REZ_RESULT_FANOUT)
+
+    async def semester_result(exam_code: str, data: list[list[str]]) -> dict:
+        outcome, archived = results_archive.lookup(session.register_no, exam_code, data)
+        if archived is not None:
+            return archived
+        if outcome == "changed":
+            forget_pdf(session, "result", exam_code)
+
+        async with fanout:
+            try:
+                gpa = await read_gpa(await pdf(session, "result", exam_code))
+            except Exception as e:
+                logger.error("Couldn't get the result PDF of %s: %s", exam_code, e)
+                gpa = None
+
+        result = _semester_result(data, gpa)
+        if gpa is not None:
+            results_archive.put(session.register_no, exam_code, data, result)
+        return result
+
+    tables = {
+        exam_code: page["tables"][div_id]
+        for exam_code, div_id in exam_codes.items()
+        if page["tables"].get(div_id)
+    }
+    results = dict(
+        zip(
+            tables,
+            await asyncio.gather(
+                *(semester_result(code, data) for code, data in tables.items())
+            ),
+        )
+    )
+
+    values = []
+    for result in results.values():
+        try:
+            values.append(float(result["gpa"]))
+        except (TypeError, ValueError):
+            pass
+
+    response = {
+        "results": results,
+        "mean_gpa": f"{sum(values) / len(values):.2f}" if values else None,
+        "note": (
+            "mean_gpa is not the official CGPA: credits aren't published, so it is "
+            "the unweighted mean of the GPAs of every exam code, arrear and "
+            "supplementary exams included."
+        ),
+    }
+
+    missing = [code for code, result in results.items() if result["gpa"] is None]
+    if missing:
+        response["note"] += (
+            f" Couldn't read the GPA of {', '.join(missing)}, the mean leaves them out."
+        )
+
+    return response
+
+
 async def download_result(ctx: Context, exam_code: str) -> str:
     """
     Generates result PDF by `exam_code`
@@ -124,27 +207,27 @@ async def download_result(ctx: Context, exam_code: str) -> str:
 
     session = ctx.get_state("session")
     logger.info(
-        f"`get_result` tool called with Session id {session.session_id} | Register No: {session.register_no}"
+        "`get_result` tool called with Session id %s | Register No: %s",
+        session.session_id,
+        session.register_no,
     )
 
-    data = await call(
-        "/exam/exam_result.php",
-        addtional_headers={"Cookie": session.cookie},
-    )
-    sp = BeautifulSoup(data, "html.parser")
-    exam_codes = {
-        option["value"].strip()[:-1]: option["value"].strip()[-1]
-        for option in sp.find_all("option")
-    }
+    page = await result_page(session)
+    exam_codes = page["exam_codes"]
 
     if not exam_codes:
         logger.info("No exam_codes found.")
         return "Currently no results are available."
 
-    token = generate_token(f"{session.session_id}:{exam_code}")
+    if exam_code in exam_codes:
+        warm_pdf(session, "result", exam_code)
+
+    token = download_token(session, exam_code)
 
     logger.info(
-        f"Result download token generated | Session ID: {session.session_id} | Register No: {session.register_no}"
+        "Result download token generated | Session ID: %s | Register No: %s",
+        session.session_id,
+        session.register_no,
     )
 
     return f"[Click here to download result]({REZConfig.REZ_BASE_URL}/pdf/result?token={token})"
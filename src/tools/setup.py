@@ -1,9 +1,9 @@
 from fastmcp import Context
 from manager import sessions
+from data import SEALED, bearer_token, open_sealed_session, revoked_sessions
 import logging
 from config import REZConfig
-from utils import call
-from bs4 import BeautifulSoup
+from pages import profile_page, forget
 from signer import generate_token
 
 logger = logging.getLogger(__name__)
@@ -28,14 +28,17 @@ async def login(ctx: Context) -> str:
 
     session_id = ctx.session_id
 
-    logger.info(f"`login` tool called with Session id: {session_id}")
+    logger.info("`login` tool called with Session id: %s", session_id)
 
-    if session_id in sessions:
+    if SEALED:
+        if open_sealed_session(bearer_token()) is not None:
+            return "You are already logged in!"
+    elif session_id in sessions:
         return "You are already logged in!"
 
     login_token = generate_token(session_id)
 
-    logger.info(f"Login token generated | Session ID: {session_id}")
+    logger.info("Login token generated | Session ID: %s", session_id)
 
     return f"[Click here to login]({REZConfig.REZ_BASE_URL}/auth/login?token={login_token})"
 
@@ -49,13 +52,25 @@ async def logout(ctx: Context) -> str:
     """
 
     session_id = ctx.session_id
-    logger.info(f"`logout` tool called with Session id: {session_id}")
-
-    if session_id not in sessions:
-        logger.info(f"Logout failed. No session {session_id} found.")
+    logger.info("`logout` tool called with Session id: %s", session_id)
+
+    if SEALED:
+        session = open_sealed_session(bearer_token())
+        if session is None:
+            logger.info(
+                "Logout failed. No sealed session in the request %s.", session_id
+            )
+            return "You aren't logged in to logout."
+
+        # the token stays valid until it expires, so remember it was logged out
+        session_id = session.session_id
+        revoked_sessions.add(session_id, int(session.expiresAt.timestamp()))
+
+    elif sessions.pop(session_id) is None:
+        logger.info("Logout failed. No session %s found.", session_id)
         return "You aren't logged in to logout."
 
-    del sessions[session_id]
+    forget(session_id)
 
     return "You are now logged out!"
 
@@ -73,23 +88,9 @@ async def get_profile(ctx: Context) -> dict:
 
     session = ctx.get_state("session")
     logger.info(
-        f"`get_profile` tool called with Session id {session.session_id} | Register No: {session.register_no}"
-    )
-
-    data = await call("/personal.php", addtional_headers={"Cookie": session.cookie})
-
-    sp = BeautifulSoup(data, "html.parser")
-    tables = sp.find("td", attrs={"align": "center"}).parent.find_all("table")
-    tables = list(
-        map(
-            lambda table: [
-                tr.td.string.strip() if tr.td.string else None
-                for tr in table.find_all("tr")
-            ],
-            tables,
-        )
+        "`get_profile` tool called with Session id %s | Register No: %s",
+        session.session_id,
+        session.register_no,
     )
 
-    profile = {k: v for k, v in zip(tables[0], tables[1])}
-
-    return profile
+    return await profile_page(session)
@@ -1,33 +1,201 @@
+import asyncio
 import httpx
 import logging
+import time
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from importlib.util import find_spec
+from admission import AdmissionError, upstream
 from config import REZConfig
+from metrics import UPSTREAM_ERRORS, UPSTREAM_HEDGES, UPSTREAM_LATENCY, UPSTREAM_RETRIES
+from policy import DEFAULT_POLICY, latencies, policy_for
 
 logger = logging.getLogger(__name__)
 
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64; rv:137.0) Gecko/20100101 Firefox/137.0"
 
-async def post(api_url: str, payload: dict) -> dict:
-    async with httpx.AsyncClient(
-        timeout=30,
+_client: httpx.AsyncClient | None = None
+
+
+def _create_client() -> httpx.AsyncClient:
+    http2 = REZConfig.REZ_HTTP2
+    if http2 and find_spec("h2") is None:
+        logger.warning("REZ_HTTP2 is set but `h2` is not installed, using HTTP/1.1")
+        http2 = False
+
+    logger.info(
+        "Creating upstream client | Base URL: %s | HTTP/2: %s",
+        REZConfig.CIT_BASE_URL,
+        http2,
+    )
+
+    return httpx.AsyncClient(
+        timeout=DEFAULT_POLICY.timeout(),
         base_url=REZConfig.CIT_BASE_URL,
         verify=False,
         follow_redirects=False,
-    ) as client:
-        try:
-            logger.info(f"Calling API at {api_url} with body {payload}")
-            response = await client.post(api_url, data=payload)
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=REZConfig.REZ_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=REZConfig.REZ_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=REZConfig.REZ_HTTP_KEEPALIVE_EXPIRY,
+        ),
+        headers={"User-Agent": USER_AGENT},
+        # The client is shared by every session, so it must never keep the
+        # CIT session cookies it sees. Each request passes its own cookie.
+        cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    """Returns the process wide upstream client, creating it on first use."""
+    global _client
+
+    if _client is None or _client.is_closed:
+        _client = _create_client()
+
+    return _client
+
+
+async def close_client():
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _metric_path(api_url: str) -> str:
+    # label by path only, query strings would make the label set unbounded
+    return api_url.partition("?")[0]
+
+
+def _retryable(error: Exception) -> bool:
+    """Whether a failed GET may succeed if sent again."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in (502, 503, 504)
+    return isinstance(error, httpx.TransportError)
+
+
+async def _send(
+    client: httpx.AsyncClient, request: httpx.Request, path: str, stream: bool
+) -> httpx.Response:
+    async with upstream.request():
+        start = time.perf_counter()
+        response = await client.send(request, stream=stream)
+        elapsed = time.perf_counter() - start
+        UPSTREAM_LATENCY.observe(elapsed, path)
+        latencies.record(path, elapsed)
+        if stream and response.is_error:
+            await response.aclose()
+        if not stream or response.is_error:
             response.raise_for_status()
-            return response.text
 
-        except httpx.HTTPStatusError as e:
-            status_code = e.response.status_code if e.response else "Unknown status"
-            content = e.response.text if e.response else "Nothing"
+    return response
+
+
+async def _hedged(send, delay: float, path: str) -> httpx.Response:
+    """
+    Sends a second request when the first one hasn't answered after `delay`
+    seconds, and returns the response that comes first. The other request is
+    cancelled, or closed if it had answered too.
+    """
+    tasks = [asyncio.create_task(send())]
+    winner = None
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            latencies.record_hedge()
+            tasks.append(asyncio.create_task(send()))
+
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    winner = task
+                    if len(tasks) > 1:
+                        UPSTREAM_HEDGES.inc(
+                            1, path, "first" if task is tasks[0] else "hedge"
+                        )
+                    return task.result()
+
+        raise tasks[0].exception()  # every request failed
+
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif task is not winner and not task.cancelled() and not task.exception():
+                await task.result().aclose()
+
+
+async def _get(
+    api_url, params: dict | None, headers: dict | None, stream: bool = False
+) -> httpx.Response:
+    """
+    Sends a GET under the policy of its path: per attempt and total timeouts,
+    retries with jittered backoff, and a hedge when it runs past the p95.
+    """
+    client = get_client()
+    path = _metric_path(api_url)
+    policy = policy_for(path)
+    request = client.build_request(
+        "GET", api_url, params=params, headers=headers, timeout=policy.timeout()
+    )
+
+    async def send():
+        return await _send(client, request, path, stream)
 
-            logger.error(f"HTTPError: ({status_code}) - {content}")
-            raise Exception(f"API HTTPError: ({status_code}) : {content}") from e
+    async with asyncio.timeout(policy.total):
+        for attempt in range(policy.retries + 1):
+            try:
+                delay = latencies.hedge_delay(path) if policy.hedge else None
+                if delay is None:
+                    return await send()
+                return await _hedged(send, delay, path)
 
-        except Exception as e:
-            logger.error(f"Failed during an API call: {str(e)}")
-            raise Exception(f"Failed to call API {str(e)}") from e
+            except Exception as e:
+                if attempt == policy.retries or not _retryable(e):
+                    raise
+
+                backoff = policy.backoff(attempt)
+                UPSTREAM_RETRIES.inc(1, path)
+                logger.warning("Retrying %s in %.2fs after: %r", path, backoff, e)
+                await asyncio.sleep(backoff)
+
+
+async def post(api_url: str, payload: dict) -> dict:
+    client = get_client()
+    path = _metric_path(api_url)
+    try:
+        logger.info("Calling API at %s", api_url)  # the body may hold credentials
+        async with upstream.request():
+            start = time.perf_counter()
+            response = await client.post(
+                api_url, data=payload, timeout=policy_for(path).timeout()
+            )
+            UPSTREAM_LATENCY.observe(time.perf_counter() - start, path)
+            response.raise_for_status()
+        return response.text
+
+    except AdmissionError as e:
+        logger.warning("Not calling API at %s: %s", api_url, e)
+        raise
+
+    except httpx.HTTPStatusError as e:
+        UPSTREAM_ERRORS.inc(1, path)
+        status_code = e.response.status_code if e.response else "Unknown status"
+        content = e.response.text if e.response else "Nothing"
+
+        logger.error("HTTPError: (%s) - %s", status_code, content)
+        raise Exception(f"API HTTPError: ({status_code}) : {content}") from e
+
+    except Exception as e:
+        UPSTREAM_ERRORS.inc(1, path)
+        logger.error("Failed during an API call: %s", e)
+        raise Exception(f"Failed to call API {str(e)}") from e
 
 
 async def call(
@@ -36,31 +204,66 @@ async def call(
     addtional_headers: dict | None = None,
     return_bytes: bool = False,
 ):
-    async with httpx.AsyncClient(
-        timeout=30,
-        base_url=REZConfig.CIT_BASE_URL,
-        verify=False,
-        headers={
-            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:137.0) Gecko/20100101 Firefox/137.0"
-        },
-    ) as client:
-        try:
-            logger.info(
-                f"Calling API at {api_url} with params {params if params else 'Nothing'}"
-            )
-            response = await client.get(
-                api_url, params=params, headers=addtional_headers
-            )
-            response.raise_for_status()
-            return response.content if return_bytes else response.text
+    path = _metric_path(api_url)
+    try:
+        logger.info(
+            "Calling API at %s with params %s", api_url, params if params else "Nothing"
+        )
+        response = await _get(api_url, params, addtional_headers)
+        return response.content if return_bytes else response.text
+
+    except AdmissionError as e:
+        logger.warning("Not calling API at %s: %s", api_url, e)
+        raise
+
+    except httpx.HTTPStatusError as e:
+        UPSTREAM_ERRORS.inc(1, path)
+        status_code = e.response.status_code if e.response else "Unknown status"
+        content = e.response.text if e.response else "Nothing"
+
+        logger.error("HTTPError: (%s) - %s", status_code, content)
+        raise Exception(f"API HTTPError: ({status_code}) : {content}") from e
+
+    except Exception as e:
+        UPSTREAM_ERRORS.inc(1, path)
+        logger.error("Failed during an API call: %s", e)
+        raise Exception(f"Failed to call API {str(e)}") from e
+
+
+async def stream(
+    api_url,
+    params: dict | None = None,
+    addtional_headers: dict | None = None,
+) -> httpx.Response:
+    """
+    Sends a GET and returns as soon as the response headers arrive.
+
+    The body is read with `response.aiter_bytes()` and the caller must close
+    the response with `response.aclose()`.
+    """
+    path = _metric_path(api_url)
+    try:
+        logger.info(
+            "Streaming API at %s with params %s",
+            api_url,
+            params if params else "Nothing",
+        )
+        # only sending is admitted and retried, the body is read after the
+        # slot is freed
+        response = await _get(api_url, params, addtional_headers, stream=True)
+
+    except AdmissionError as e:
+        logger.warning("Not streaming API at %s: %s", api_url, e)
+        raise
 
-        except httpx.HTTPStatusError as e:
-            status_code = e.response.status_code if e.response else "Unknown status"
-            content = e.response.text if e.response else "Nothing"
+    except httpx.HTTPStatusError as e:
+        UPSTREAM_ERRORS.inc(1, path)
+        logger.error("HTTPError: (%s) - streamed response", e.response.status_code)
+        raise Exception(f"API HTTPError: ({e.response.status_code})") from e
 
-            logger.error(f"HTTPError: ({status_code}) - {content}")
-            raise Exception(f"API HTTPError: ({status_code}) : {content}") from e
+    except Exception as e:
+        UPSTREAM_ERRORS.inc(1, path)
+        logger.error("Failed during an API call: %s", e)
+        raise Exception(f"Failed to call API {str(e)}") from e
 
-        except Exception as e:
-            logger.error(f"Failed during an API call: {str(e)}")
-            raise Exception(f"Failed to call API {str(e)}") from e
+    return response